@@ -1,2 +1,7 @@
 from secprint.secprint import SectionPrinter
+from secprint.secprint import Printer
 from secprint.secprint import Color
+from secprint.secprint import Style
+from secprint.secprint import LazyText
+from secprint.secprint import LiveLine
+from secprint.output import FlushPolicy, OverflowPolicy
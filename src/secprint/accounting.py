@@ -0,0 +1,137 @@
+"""
+Accounting of the output of SectionPrinter, by section.
+
+An OutputAccounting is a PrinterHook counting, for each path of section titles, the lines and bytes written, the lines that were
+not shown (printer deactivated or section deeper than the maximum depth) and the time spent printing. It tells which sections
+are responsible for the volume of a log and for the time spent printing it.
+
+Usage example::
+
+    accounting = OutputAccounting()
+    Spt.add_hook(accounting)
+    ...
+    Spt.remove_hook(accounting)
+    accounting.print_summary()
+"""
+import threading
+from typing import Dict, List, Optional, TextIO, Tuple, Union
+
+from secprint.profiler import format_duration, write_text
+from secprint.secprint import Color, Printer, PrinterHook, SectionPrinter, _Section
+
+
+class SectionCounters:
+    """
+    Output of a section, not including the output of its subsections.
+    """
+
+    __slots__ = ('prints', 'lines', 'bytes', 'suppressed_lines', 'print_ns', 'entries')
+
+    def __init__(self):
+        self.prints = 0  # Number of calls to print and print_lines
+        self.lines = 0  # Number of lines written
+        self.bytes = 0  # Number of bytes written (UTF-8 encoded, escape sequences included)
+        self.suppressed_lines = 0  # Number of lines not shown because of the maximum depth or the deactivation of the printer
+        self.print_ns = 0  # Time spent printing, in nanoseconds
+        self.entries = 0  # Number of times the section has been entered
+
+    def add(self, other: 'SectionCounters') -> None:
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+
+class OutputAccounting(PrinterHook):
+    """
+    Hook of a printer counting its output by path of section titles. The counters of a path only include what is printed
+    directly in the sections with this path; total gives the counters of a whole subtree.
+    """
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, ...], SectionCounters] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, path: Tuple[str, ...]) -> SectionCounters:
+        counters = self.counters.get(path)
+        if counters is None:
+            with self._lock:
+                counters = self.counters.setdefault(path, SectionCounters())
+        return counters
+
+    def on_enter(self, section: _Section) -> None:
+        counters = self._get(section.path)
+        with self._lock:
+            counters.entries += 1
+
+    def on_line(self, section: _Section, n_lines: int, n_bytes: int, suppressed: bool, duration_ns: int) -> None:
+        counters = self._get(section.path)
+        with self._lock:
+            counters.prints += 1
+            if suppressed:
+                counters.suppressed_lines += n_lines
+            else:
+                counters.lines += n_lines
+                counters.bytes += n_bytes
+            counters.print_ns += duration_ns
+
+    def get(self, path: Tuple[str, ...] = ()) -> SectionCounters:
+        """
+        Get the counters of the sections with a path of titles, the empty path being the text printed outside of any section.
+        """
+        return self.counters.get(tuple(path)) or SectionCounters()
+
+    def total(self, path: Tuple[str, ...] = ()) -> SectionCounters:
+        """
+        Get the sum of the counters of the sections with a path of titles and of all their subsections. The empty path gives the
+        totals of the whole output.
+        """
+        path = tuple(path)
+        total = SectionCounters()
+        with self._lock:
+            for counters_path, counters in self.counters.items():
+                if counters_path[:len(path)] == path:
+                    total.add(counters)
+        return total
+
+    def summary(self, sort_by: str = 'bytes', limit: Optional[int] = None) -> List[str]:
+        """
+        Get a table of the counters, one line per path, from the path with the highest counter to the lowest one.
+        :param sort_by: counter to sort the paths by ('bytes', 'lines', 'suppressed_lines', 'print_ns', 'prints' or 'entries').
+        :param limit: maximum number of paths in the table. Leave it as None to include all of them.
+        """
+        with self._lock:
+            items = sorted(self.counters.items(), key=lambda item: getattr(item[1], sort_by), reverse=True)[:limit]
+        return [f'{" / ".join(title or "<untitled>" for title in path) or "<no section>"}: {counters.lines} lines | '
+                f'{counters.bytes} B | {counters.suppressed_lines} suppressed | {counters.prints} prints in '
+                f'{format_duration(counters.print_ns)}' for path, counters in items]
+
+    def print_summary(self, color: Union[Color, str] = Color.CYAN, title: str = 'Output by section', sort_by: str = 'bytes',
+                      limit: Optional[int] = None, printer: Optional[Printer] = None) -> None:
+        """
+        Print the table of the counters through a printer (see summary). The summary itself is not counted.
+        :param color: color of the section containing the table.
+        :param title: title of the section containing the table.
+        :param sort_by: counter to sort the paths by.
+        :param limit: maximum number of paths in the table.
+        :param printer: printer to print the table with. Leave it as None to use the default printer of SectionPrinter.
+        """
+        if printer is None:
+            printer = SectionPrinter.self
+        lines = self.summary(sort_by, limit)
+        hooked = self in printer.hooks
+        if hooked:
+            printer.remove_hook(self)
+        try:
+            with printer(title, color):
+                printer.print_lines(lines)
+        finally:
+            if hooked:
+                printer.add_hook(self)
+
+    def dump(self, file: Union[str, TextIO], sort_by: str = 'bytes', limit: Optional[int] = None) -> None:
+        """
+        Write the table of the counters (see summary) without colors nor headers.
+        :param file: path of the file to write or text file object to write to.
+        :param sort_by: counter to sort the paths by.
+        :param limit: maximum number of paths in the table.
+        """
+        write_text(file, ''.join(line + '\n' for line in self.summary(sort_by, limit)))
@@ -0,0 +1,71 @@
+"""
+Bridge from the logging module to SectionPrinter.
+
+A SectionHandler prints the records of the standard loggers through a printer, so that the logs of other libraries appear in the
+current section, with the color of their level. A SectionFormatter adds the headers of the current section to the records
+formatted for any other handler, for example one writing to a file.
+
+Usage example::
+
+    logging.getLogger().addHandler(SectionHandler())
+    with Spt('Training'):
+        logging.getLogger('library').warning('low memory')
+"""
+import logging
+from typing import Optional
+
+from secprint.secprint import Printer, SectionPrinter, _format_text, _level_color
+
+
+class SectionHandler(logging.Handler):
+    """
+    Handler printing the records through a printer, in the current section of the thread logging them. The records are only
+    formatted if the printer would print them: records below the level of the printer, or logged while it is deactivated or
+    beyond its maximum depth, cost nothing more than their creation.
+    """
+
+    def __init__(self, printer: Optional[Printer] = None, level: int = logging.NOTSET):
+        """
+        :param printer: printer to print the records with. Leave it as None to use the default printer of SectionPrinter.
+        :param level: minimum level of the records handled.
+        """
+        super().__init__(level)
+        self.printer = printer if printer is not None else SectionPrinter.self
+
+    def emit(self, record: logging.LogRecord) -> None:
+        printer = self.printer
+        if record.levelno < printer.level or printer._is_hidden():
+            return
+        try:
+            text = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        printer.print(text, level=record.levelno)
+
+
+class SectionFormatter(logging.Formatter):
+    """
+    Formatter prefixing every line of the records with the headers of the current section of a printer, and giving them the
+    color of their level.
+    """
+
+    def __init__(self, fmt: Optional[str] = None, datefmt: Optional[str] = None, style: str = '%',
+                 printer: Optional[Printer] = None, coloring: Optional[bool] = None):
+        """
+        :param fmt: format of the records, as for logging.Formatter.
+        :param datefmt: format of the dates, as for logging.Formatter.
+        :param style: style of fmt, as for logging.Formatter.
+        :param printer: printer whose current section prefixes the records. Leave it as None to use the default printer.
+        :param coloring: if set to false, the records are formatted without colors. Leave it as None to follow the coloring of
+        the printer.
+        """
+        super().__init__(fmt, datefmt, style)
+        self.printer = printer if printer is not None else SectionPrinter.self
+        self.coloring = coloring
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        printer = self.printer
+        coloring = printer.coloring if self.coloring is None else self.coloring
+        return _format_text(printer.section_var.get(), text, _level_color(record.levelno), coloring, end='')[0]
@@ -0,0 +1,184 @@
+"""
+Aggregation of the output of worker processes under the sections of the parent process.
+
+Workers do not format nor write anything: they send lightweight records (headers of their sections, style and text) through a
+queue, in batches. A listener thread of the parent process renders them nested under the section that was active in the parent
+when it was started, and writes them in batches. The output of each top-level section of a worker is written at once when the
+section is exited, so the lines of concurrent workers never interleave.
+
+Usage example::
+
+    with Spt("Processing", color="blue"), RecordListener() as listener:
+        with ProcessPoolExecutor(initializer=init_worker, initargs=(listener.queue,)) as executor:
+            results = list(executor.map(process, items))
+"""
+import multiprocessing
+import multiprocessing.util
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from secprint.secprint import RecordSink, SectionPrinter, _Section, _ROOT_SECTION, _format_text
+
+
+class _QueueSink(RecordSink):
+    """
+    Record sink of the worker processes, sending the printed texts with the headers of their sections to the parent process. The
+    records are sent in batches, as (process id, records, complete) tuples: a batch is complete when it ends a top-level section
+    of the worker, which is when the parent can render it. A text printed outside of any section is held until the next one,
+    since it may be the title of a section about to be entered.
+    """
+
+    def __init__(self, record_queue: multiprocessing.SimpleQueue, batch_size: int = 1000):
+        self.queue = record_queue
+        self.batch_size = batch_size
+        self._pid = os.getpid()
+        self._records = []
+        self._lock = threading.Lock()
+
+    def on_print(self, section: _Section, style: str, text: str, print_headers: bool, rewrite: bool, end: str) -> None:
+        record = (section.headers, style, text, print_headers, rewrite, end)
+        with self._lock:
+            if section.depth == 0:
+                # Outside of any section, the records held are complete
+                self._send(True)
+            self._records.append(record)
+            if len(self._records) >= self.batch_size:
+                self._send(False)
+
+    def on_exit(self, section: _Section) -> None:
+        if section.depth == 1:
+            with self._lock:
+                self._send(True)
+
+    def flush(self) -> None:
+        """
+        Send the records held, as a complete batch.
+        """
+        with self._lock:
+            self._send(True)
+
+    def _send(self, complete: bool) -> None:
+        """
+        Send the buffered records to the parent process. The lock must be held.
+        """
+        if self._records or complete:
+            self.queue.put((self._pid, self._records, complete))
+            self._records = []
+
+
+def init_worker(record_queue: multiprocessing.SimpleQueue) -> None:
+    """
+    Initialize a worker process so that everything it prints is sent as records to the parent process. It is meant to be used as
+    the initializer of a multiprocessing.Pool or of a concurrent.futures.ProcessPoolExecutor.
+    :param record_queue: queue of a RecordListener of the parent process.
+    """
+    # Forget the sections inherited from the parent process: they are rendered by the parent itself
+    SectionPrinter.self.section_var.set(_ROOT_SECTION)
+    sink = _QueueSink(record_queue)
+    SectionPrinter.set_record_sink(sink)
+    # The worker processes do not run the atexit handlers, but they do run the finalizers of multiprocessing
+    multiprocessing.util.Finalize(sink, sink.flush, exitpriority=10)
+
+
+class RecordListener:
+    """
+    Receive the records sent by worker processes and print them under the section that is active when the listener is started.
+    The records of each worker are held until its top-level section is exited, and then printed at once. The maximum depth of
+    the printer applies to them as if they had been printed by the parent process.
+    """
+
+    def __init__(self, record_queue: Optional[multiprocessing.SimpleQueue] = None, batch_size: int = 1000):
+        """
+        :param record_queue: queue through which the workers send their records. Leave it as None to create a new one.
+        :param batch_size: maximum number of batches of records received before they are rendered and written at once.
+        """
+        # A SimpleQueue writes to the pipe synchronously, so the records of a section are all sent before the task returns
+        self.queue = record_queue if record_queue is not None else multiprocessing.SimpleQueue()
+        self.batch_size = batch_size
+        self._sections: Dict[Tuple[str, ...], _Section] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Start rendering the records in a background thread, under the section currently active.
+        """
+        self._sections = {(): SectionPrinter.self.section_var.get()}
+        self._thread = threading.Thread(target=self._run, name='secprint-record-listener', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Render all the records sent so far and stop the background thread.
+        """
+        self.queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self) -> 'RecordListener':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+    def _section(self, headers: Tuple[str, ...]) -> _Section:
+        section = self._sections.get(headers)
+        if section is None:
+            section = self._section(headers[:-1]).push(headers[-1])
+            self._sections[headers] = section
+        return section
+
+    def _run(self) -> None:
+        record_queue = self.queue
+        # Records of the top-level sections that the workers have not exited yet, by process id
+        pending: Dict[int, List[tuple]] = {}
+        running = True
+        while running:
+            messages = [record_queue.get()]
+            while len(messages) < self.batch_size and not record_queue.empty():
+                messages.append(record_queue.get())
+
+            records = []
+            for message in messages:
+                if message is None:
+                    running = False
+                    continue
+                pid, batch, complete = message
+                if complete:
+                    records += pending.pop(pid, ())
+                    records += batch
+                else:
+                    pending.setdefault(pid, []).extend(batch)
+            if not running:
+                # Sections left unfinished by the workers (e.g. a worker that crashed) are still shown
+                for batch in pending.values():
+                    records += batch
+            if records:
+                self._render(records)
+
+    def _render(self, records: List[tuple]) -> None:
+        coloring = SectionPrinter.self.coloring
+        sinks = SectionPrinter.self.sinks
+        # Like the prints of the parent, the records deeper than the maximum depth are not shown, their depth being counted from
+        # the root of the parent's sections
+        max_depth = SectionPrinter.self.max_depth
+        base_depth = self._sections[()].depth
+        # The records are formatted once per coloring used by the main output and the additional sinks
+        batches = {coloring: []}
+        for _, sink_coloring in sinks:
+            batches.setdefault(sink_coloring, [])
+        n_lines = 0
+        for headers, style, text, print_headers, rewrite, end in records:
+            if max_depth is not None and base_depth + len(headers) > max_depth:
+                continue
+            section = self._section(headers)
+            for batch_coloring, chunks in batches.items():
+                chunk, n_chunk_lines = _format_text(section, text, style, batch_coloring, print_headers, rewrite, end)
+                chunks.append(chunk)
+            n_lines += n_chunk_lines
+        if n_lines and SectionPrinter.self.activated:
+            texts = {batch_coloring: ''.join(chunks) for batch_coloring, chunks in batches.items()}
+            SectionPrinter.self.output.write(texts[coloring], n_lines)
+            for output, sink_coloring in sinks:
+                output.write(texts[sink_coloring], n_lines)
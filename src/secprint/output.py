@@ -0,0 +1,609 @@
+import asyncio
+import atexit
+import os
+import sys
+import threading
+import weakref
+from array import array
+from collections import deque
+from enum import Enum
+from typing import BinaryIO, Callable, Deque, Optional, TextIO, Union
+
+
+class FlushPolicy(str, Enum):
+    """
+    Policies deciding when the text buffered by an OutputBuffer is handed to its stream.
+    """
+
+    LINE = 'line'  # Write every line (or batch of lines of a single print) as soon as it is formatted.
+    COUNT = 'count'  # Write when the buffer holds more than a given number of lines or bytes.
+    SECTION = 'section'  # Write when a section is exited.
+    EXIT = 'exit'  # Write only when the interpreter exits (or on an explicit flush).
+
+
+class OverflowPolicy(str, Enum):
+    """
+    Policies deciding what a ThreadedWriter does with a new line when its queue is full.
+    """
+
+    BLOCK = 'block'  # Wait until the writer thread makes some room in the queue.
+    DROP_OLDEST = 'drop_oldest'  # Discard the oldest line of the queue to make room for the new one.
+    DROP_NEWEST = 'drop_newest'  # Discard the new line.
+
+
+# Outputs holding buffered text, written when the interpreter exits. They are only weakly referenced, so that the outputs of
+# short-lived printers can be collected.
+_PENDING_OUTPUTS = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_pending_outputs() -> None:
+    outputs = list(_PENDING_OUTPUTS)
+    # The printers may still hold some text (e.g. the count of coalesced lines), which can go to any of the outputs: it is handed
+    # to them before any of them is written
+    for output in outputs:
+        if output.before_flush is not None:
+            output.before_flush()
+    for output in outputs:
+        output.flush()
+
+
+class OutputBuffer:
+    """
+    Output engine collecting fully formatted lines and writing them to a stream in a single call per flush.
+
+    Each piece of text handed to the buffer is written with a single call to the stream, so the lines of one thread can never be
+    split by the lines of another one. Writers never take a lock: with the LINE policy the text goes straight to the stream, and
+    with the other policies it is appended to a deque, which is thread-safe. Only flushes are serialized.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, policy: FlushPolicy = FlushPolicy.LINE, max_lines: int = 1000,
+                 max_bytes: int = 1 << 16):
+        """
+        :param stream: stream to write to. Leave it as None to always write to the current sys.stdout.
+        :param policy: policy deciding when the buffered text is written to the stream.
+        :param max_lines: with the COUNT policy, number of buffered lines after which the buffer is written.
+        :param max_bytes: with the COUNT policy, number of buffered bytes (UTF-8 encoded) after which the buffer is written.
+        """
+        self.stream = stream
+        self.policy = FlushPolicy(policy)
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self._chunks: Deque[str] = deque()
+        self._flush_lock = threading.Lock()
+        self._n_lines = 0
+        self._n_bytes = 0
+        # Called before each flush, for the printer to hand over the text it still holds
+        self.before_flush: Optional[Callable[[], None]] = None
+        _PENDING_OUTPUTS.add(self)
+
+    def write(self, text: str, n_lines: int = 1) -> None:
+        """
+        Hand some formatted text to the buffer, writing it to the stream right away if the policy requires it.
+        :param text: text to write, already containing its line endings.
+        :param n_lines: number of lines contained in the text.
+        """
+        if self.policy is FlushPolicy.LINE:
+            (self.stream or sys.stdout).write(text)
+            return
+
+        self._chunks.append(text)
+        if self.policy is FlushPolicy.COUNT:
+            self._n_lines += n_lines
+            # The length of an ASCII text is its number of bytes, only the other texts need to be encoded to be measured
+            self._n_bytes += len(text) if text.isascii() else len(text.encode())
+            if self._n_lines >= self.max_lines or self._n_bytes >= self.max_bytes:
+                self.flush()
+
+    def section_exited(self, depth: int) -> None:
+        """
+        Notify the buffer that a section has been exited.
+        :param depth: number of sections still entered after the exit.
+        """
+        if self.policy is FlushPolicy.SECTION:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write all the buffered text to the stream in a single call.
+        """
+        if self.before_flush is not None:
+            self.before_flush()
+        with self._flush_lock:
+            chunks = self._chunks
+            # Only pop what is there now: other threads may keep appending while the buffer is flushed
+            n_chunks = len(chunks)
+            if n_chunks:
+                text = ''.join([chunks.popleft() for _ in range(n_chunks)])
+                self._n_lines = 0
+                self._n_bytes = 0
+                (self.stream or sys.stdout).write(text)
+
+    def close(self) -> None:
+        """
+        Flush the buffer and stop watching the interpreter exit.
+        """
+        self.flush()
+        _PENDING_OUTPUTS.discard(self)
+
+    def __del__(self) -> None:
+        # A buffer collected before the interpreter exits still writes the text it holds
+        self.before_flush = None
+        self.flush()
+
+
+class BinaryOutput:
+    """
+    Output engine working on bytes: the lines are encoded and copied at the write offset of a preallocated bytearray, reused from
+    one write to the next, which is written in large chunks straight to a binary stream or to a file descriptor, bypassing the
+    text layer of the streams. The printer hands it the headers of the sections already encoded (they are encoded once, when the
+    sections are entered), so that printing a line only encodes the text itself. It exposes the same interface as OutputBuffer so
+    that it can replace it in the printer, plus write_text, the fast path used by the printer.
+    """
+
+    def __init__(self, target: Union[BinaryIO, int, None] = None, policy: FlushPolicy = FlushPolicy.COUNT,
+                 max_lines: int = 10000, max_bytes: int = 1 << 16):
+        """
+        :param target: binary stream (e.g. sys.stdout.buffer, a file opened in binary mode) or file descriptor to write to. Leave
+        it as None to always write to the binary buffer of the current sys.stdout.
+        :param policy: policy deciding when the buffered bytes are written to the target.
+        :param max_lines: with the COUNT policy, number of buffered lines after which the buffer is written.
+        :param max_bytes: with the COUNT policy, number of buffered bytes after which the buffer is written.
+        """
+        self.stream = target
+        self.policy = FlushPolicy(policy)
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        # Never shrunk: only the bytes before the write offset _size are pending, the rest is room for the next lines
+        self._buffer = bytearray(max_bytes)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._n_lines = 0
+        # Called before each flush, for the printer to hand over the text it still holds
+        self.before_flush: Optional[Callable[[], None]] = None
+        _PENDING_OUTPUTS.add(self)
+
+    def write(self, text: str, n_lines: int = 1) -> None:
+        """
+        Hand some formatted text to the buffer, writing it to the target right away if the policy requires it.
+        :param text: text to write, already containing its line endings.
+        :param n_lines: number of lines contained in the text.
+        """
+        data = text.encode()
+        with self._lock:
+            start = self._size
+            self._size = end = start + len(data)
+            self._buffer[start:end] = data  # Grows the buffer if it is too small
+            self._added(n_lines)
+
+    def write_text(self, start: bytes, style: bytes, text: str, style_end: bytes, end: str = '\n') -> None:
+        """
+        Hand a text to the buffer, each of its lines being preceded by start and style and followed by style_end.
+        :param start: encoded bytes starting each line (headers of the section, carriage return, ...).
+        :param style: encoded escape sequences giving its color and effects to the text.
+        :param text: text to write. It can contain several lines.
+        :param style_end: encoded escape sequences ending each line.
+        :param end: character to write at the end of the text.
+        """
+        encoded = text.encode()
+        n_lines = 1
+        if '\n' in text:
+            n_lines += text.count('\n')
+            encoded = encoded.replace(b'\n', style_end + b'\n' + start + style)
+        data = b''.join((start, style, encoded, style_end, b'\n' if end == '\n' else end.encode()))
+        with self._lock:
+            offset = self._size
+            self._size = size = offset + len(data)
+            self._buffer[offset:size] = data  # Grows the buffer if it is too small
+            # Same as _added, inlined in this hot path
+            policy = self.policy
+            if policy is FlushPolicy.COUNT:
+                self._n_lines += n_lines
+                if self._n_lines >= self.max_lines or size >= self.max_bytes:
+                    self._write_buffer()
+            elif policy is FlushPolicy.LINE:
+                self._write_buffer()
+
+    def _added(self, n_lines: int) -> None:
+        """
+        Write the buffer to the target if the policy requires it, after n_lines lines have been added. The lock must be held.
+        """
+        policy = self.policy
+        if policy is FlushPolicy.COUNT:
+            self._n_lines += n_lines
+            if self._n_lines >= self.max_lines or self._size >= self.max_bytes:
+                self._write_buffer()
+        elif policy is FlushPolicy.LINE:
+            self._write_buffer()
+
+    def _write_buffer(self) -> None:
+        """
+        Write the pending bytes of the buffer to the target. The lock must be held.
+        """
+        size = self._size
+        self._n_lines = 0
+        if not size:
+            return
+        target = self.stream
+        if target is None:
+            # Whatever was written to the text layer of sys.stdout must come first
+            sys.stdout.flush()
+            target = getattr(sys.stdout, 'buffer', None)
+            if target is None:
+                # sys.stdout has been replaced by a text-only stream (e.g. io.StringIO)
+                sys.stdout.write(self._buffer[:size].decode())
+                self._size = 0
+                return
+        # The views must be released before the next write, which may have to grow the buffer
+        with memoryview(self._buffer) as view, view[:size] as pending:
+            if isinstance(target, int):
+                written = 0
+                while written < size:
+                    written += os.write(target, pending[written:])
+            else:
+                target.write(pending)
+        self._size = 0
+
+    def section_exited(self, depth: int) -> None:
+        """
+        Notify the buffer that a section has been exited.
+        :param depth: number of sections still entered after the exit.
+        """
+        if self.policy is FlushPolicy.SECTION:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write all the buffered bytes to the target, and flush the target if it is a stream.
+        """
+        if self.before_flush is not None:
+            self.before_flush()
+        with self._lock:
+            self._write_buffer()
+            target = self.stream if self.stream is not None else sys.stdout
+            if not isinstance(target, int):
+                target.flush()
+
+    def close(self) -> None:
+        """
+        Flush the buffer and stop watching the interpreter exit.
+        """
+        self.flush()
+        _PENDING_OUTPUTS.discard(self)
+
+    def __del__(self) -> None:
+        # A buffer collected before the interpreter exits still writes the bytes it holds
+        self.before_flush = None
+        if self._size:
+            self.flush()
+
+
+class AsyncWriter:
+    """
+    Output engine for asyncio programs: the formatted text is put in a queue that a task of the event loop drains in bulk, handing
+    each batch to a thread of the default executor. A slow stream (terminal, pipe, ...) therefore never stalls the event loop.
+    It exposes the same interface as OutputBuffer so that it can replace it in the printer.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """
+        :param stream: stream to write to. Leave it as None to always write to the current sys.stdout.
+        :param loop: event loop on which the queue is drained. Leave it as None to use the running loop.
+        """
+        self.stream = stream
+        self.policy = FlushPolicy.LINE
+        self.max_lines = None
+        self.max_bytes = None
+        self._loop = loop if loop is not None else asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = self._loop.create_task(self._drain())
+        # Called before each flush, for the printer to hand over the text it still holds
+        self.before_flush: Optional[Callable[[], None]] = None
+        atexit.register(self.close)
+
+    def write(self, text: str, n_lines: int = 1) -> None:
+        """
+        Enqueue some formatted text. It can be called from any thread.
+        :param text: text to write, already containing its line endings.
+        :param n_lines: number of lines contained in the text.
+        """
+        if threading.get_ident() == self._loop_thread:
+            self._queue.put_nowait(text)
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, text)
+
+    def section_exited(self, depth: int) -> None:
+        """
+        Notify the writer that a section has been exited. The queue is drained continuously, so there is nothing to do.
+        :param depth: number of sections still entered after the exit.
+        """
+        pass
+
+    def flush(self) -> None:
+        """
+        Only enqueue the text the printer still holds: the queue is drained continuously by the event loop. Await drain to wait
+        until everything is written.
+        """
+        if self.before_flush is not None:
+            self.before_flush()
+
+    async def drain(self) -> None:
+        """
+        Wait until all the enqueued text has been written to the stream.
+        """
+        await self._queue.join()
+
+    async def _drain(self) -> None:
+        queue = self._queue
+        while True:
+            chunks = [await queue.get()]
+            while not queue.empty():
+                chunks.append(queue.get_nowait())
+            try:
+                await self._loop.run_in_executor(None, (self.stream or sys.stdout).write, ''.join(chunks))
+            finally:
+                for _ in chunks:
+                    queue.task_done()
+
+    async def aclose(self) -> None:
+        """
+        Wait until all the enqueued text has been written, then stop draining the queue.
+        """
+        await self.drain()
+        self.close()
+
+    def close(self) -> None:
+        """
+        Stop draining the queue and synchronously write whatever is still in it.
+        """
+        if self.before_flush is not None:
+            self.before_flush()
+        if not self._task.done() and not self._loop.is_closed():
+            self._task.cancel()
+        chunks = []
+        while not self._queue.empty():
+            chunks.append(self._queue.get_nowait())
+        if chunks:
+            (self.stream or sys.stdout).write(''.join(chunks))
+        atexit.unregister(self.close)
+
+
+class ThreadedWriter:
+    """
+    Output engine handing the formatted text to a dedicated writer thread through a bounded queue, so that printing never waits
+    for a slow stream (terminal, SSH session, full pipe, ...). The writer thread drains the whole queue at once and writes it in a
+    single call. If writing to the stream fails (e.g. BrokenPipeError), the writer thread stops and keeps the error in the error
+    attribute: the text is then written synchronously by the printing threads, which get the errors of the stream as they would
+    without the writer. It exposes the same interface as OutputBuffer so that it can replace it in the printer.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, max_size: int = 10000,
+                 overflow: OverflowPolicy = OverflowPolicy.BLOCK):
+        """
+        :param stream: stream to write to. Leave it as None to always write to the current sys.stdout.
+        :param max_size: maximum number of pieces of text waiting in the queue.
+        :param overflow: policy deciding what to do with new text when the queue is full.
+        """
+        self.stream = stream
+        self.policy = FlushPolicy.LINE
+        self.max_lines = None
+        self.max_bytes = None
+        self.max_size = max_size
+        self.overflow = OverflowPolicy(overflow)
+        self.dropped = 0  # Number of pieces of text discarded because the queue was full
+        self.error: Optional[BaseException] = None  # Error that stopped the writer thread
+        self._queue: Deque[str] = deque()
+        self._lock = threading.Lock()
+        self._has_text = threading.Condition(self._lock)  # Notified when some text is enqueued
+        self._progress = threading.Condition(self._lock)  # Notified when the writer thread takes or writes some text
+        self._writing = False
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name='secprint-writer', daemon=True)
+        self._thread.start()
+        # Called before each flush, for the printer to hand over the text it still holds
+        self.before_flush: Optional[Callable[[], None]] = None
+        atexit.register(self.close)
+
+    def write(self, text: str, n_lines: int = 1) -> None:
+        """
+        Enqueue some formatted text, applying the overflow policy if the queue is full.
+        :param text: text to write, already containing its line endings.
+        :param n_lines: number of lines contained in the text.
+        """
+        with self._lock:
+            queue = self._queue
+            if self.error is not None:
+                queue.append(text)
+                self._write_queue()
+                return
+            if len(queue) >= self.max_size:
+                if self.overflow is OverflowPolicy.BLOCK:
+                    while len(queue) >= self.max_size and self.error is None:
+                        self._progress.wait()
+                    if self.error is not None:
+                        queue.append(text)
+                        self._write_queue()
+                        return
+                elif self.overflow is OverflowPolicy.DROP_OLDEST:
+                    queue.popleft()
+                    self.dropped += 1
+                else:
+                    self.dropped += 1
+                    return
+            queue.append(text)
+            if len(queue) == 1:
+                self._has_text.notify()
+
+    def section_exited(self, depth: int) -> None:
+        """
+        Notify the writer that a section has been exited. When leaving the last section, wait until everything is written.
+        :param depth: number of sections still entered after the exit.
+        """
+        if depth == 0:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Wait until the writer thread has written all the enqueued text.
+        """
+        if self.before_flush is not None:
+            self.before_flush()
+        with self._lock:
+            while (self._queue or self._writing) and self._thread.is_alive() and self.error is None:
+                self._progress.wait()
+            if self.error is not None:
+                self._write_queue()
+
+    def _write_queue(self) -> None:
+        """
+        Write the enqueued text from the calling thread, once the writer thread has stopped. The lock must be held.
+        """
+        if self._queue:
+            text = ''.join(self._queue)
+            self._queue.clear()
+            (self.stream or sys.stdout).write(text)
+
+    def _run(self) -> None:
+        stream_queue = self._queue
+        while True:
+            with self._lock:
+                while not stream_queue and not self._closing:
+                    self._has_text.wait()
+                if not stream_queue:
+                    return
+                text = ''.join(stream_queue)
+                stream_queue.clear()
+                self._writing = True
+                self._progress.notify_all()
+            try:
+                (self.stream or sys.stdout).write(text)
+            except Exception as error:
+                with self._lock:
+                    # The text that could not be written is left for the printing threads to write
+                    self._queue.appendleft(text)
+                    self.error = error
+                    self._writing = False
+                    self._progress.notify_all()
+                return
+            with self._lock:
+                self._writing = False
+                self._progress.notify_all()
+
+    def close(self) -> None:
+        """
+        Write all the enqueued text and stop the writer thread.
+        """
+        if self.before_flush is not None:
+            self.before_flush()
+        with self._lock:
+            self._closing = True
+            self._has_text.notify()
+        self._thread.join()
+        atexit.unregister(self.close)
+        if self.error is not None:
+            with self._lock:
+                self._write_queue()
+
+
+class RingBuffer:
+    """
+    Compact buffer keeping only the last lines written to it, for instance to dump the detailed output that led to an error. The
+    lines are stored encoded in a preallocated bytearray used as a circular buffer, and an array of offsets tells where each line
+    starts, so that writing a line never allocates anything beyond its encoding.
+    """
+
+    def __init__(self, max_lines: int = 1000, max_bytes: int = 1 << 20):
+        """
+        :param max_lines: maximum number of lines kept.
+        :param max_bytes: maximum number of bytes kept (the lines are encoded in UTF-8).
+        """
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self._data = bytearray(max_bytes)
+        self._starts = array('q', bytes(8 * max_lines))  # Offsets of the lines kept, in a circular array
+        self._first = 0  # Index in _starts of the oldest line kept
+        self._n_lines = 0
+        self._end = 0  # Offset of the end of the last line, i.e. number of bytes written since the creation of the buffer
+        self._lock = threading.Lock()
+
+    def write(self, text: str, n_lines: int = 1) -> None:
+        """
+        Add some formatted text to the buffer, discarding the oldest lines if needed.
+        :param text: text to add, already containing its line endings.
+        :param n_lines: number of lines contained in the text.
+        """
+        data = text.encode('utf-8', 'replace')
+        length = len(data)
+        if not length:
+            return
+        if length > self.max_bytes:
+            data = data[-self.max_bytes:]
+            length = self.max_bytes
+        data = memoryview(data)
+        with self._lock:
+            if n_lines == 1 and data[-1] == 10:
+                self._add(data)
+                return
+            start = 0
+            while start < length:
+                end = data.obj.find(b'\n', start) + 1 or length
+                self._add(data[start:end])
+                start = end
+
+    def _add(self, line: memoryview) -> None:
+        size = len(line)
+        max_lines = self.max_lines
+        max_bytes = self.max_bytes
+        starts = self._starts
+        while self._n_lines and (self._n_lines >= max_lines or self._end + size - starts[self._first] > max_bytes):
+            self._first = (self._first + 1) % max_lines
+            self._n_lines -= 1
+        starts[(self._first + self._n_lines) % max_lines] = self._end
+        self._n_lines += 1
+
+        position = self._end % max_bytes
+        first_part = min(size, max_bytes - position)
+        self._data[position:position + first_part] = line[:first_part]
+        if first_part < size:
+            self._data[:size - first_part] = line[first_part:]
+        self._end += size
+
+    @property
+    def n_lines(self) -> int:
+        """
+        Number of lines currently kept.
+        """
+        return self._n_lines
+
+    def getvalue(self) -> str:
+        """
+        Get the text of all the lines kept, from the oldest to the most recent one.
+        """
+        with self._lock:
+            if not self._n_lines:
+                return ''
+            size = self._end - self._starts[self._first]
+            position = self._starts[self._first] % self.max_bytes
+            if position + size <= self.max_bytes:
+                data = bytes(self._data[position:position + size])
+            else:
+                data = bytes(self._data[position:]) + bytes(self._data[:position + size - self.max_bytes])
+        return data.decode('utf-8', 'replace')
+
+    def dump(self, stream: Optional[TextIO] = None) -> None:
+        """
+        Write all the lines kept to a stream.
+        :param stream: stream to write to. Leave it as None to write to the current sys.stderr.
+        """
+        stream = stream or sys.stderr
+        stream.write(self.getvalue())
+        stream.flush()
+
+    def clear(self) -> None:
+        """
+        Discard all the lines kept.
+        """
+        with self._lock:
+            self._first = 0
+            self._n_lines = 0
@@ -0,0 +1,203 @@
+"""
+Timing of the sections of SectionPrinter.
+
+A SectionProfiler aggregates the time spent in the sections by path of titles, in a tree counting the number of times each
+section has been entered, and its total, self and maximum durations. The tree can be printed through SectionPrinter itself or
+exported for flamegraph tools (collapsed stacks) and for speedscope.
+
+Usage example::
+
+    profiler = SectionProfiler()
+    Spt.set_profiler(profiler)
+    ...
+    Spt.set_profiler(None)
+    profiler.print_tree()
+"""
+import json
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple, Union
+
+from secprint.secprint import Color, Printer, SectionPrinter
+
+
+class ProfileNode:
+    """
+    Aggregated timings of a section, identified by its title and the titles of the sections containing it.
+    """
+
+    __slots__ = ('title', 'count', 'total_ns', 'self_ns', 'max_ns', 'children')
+
+    def __init__(self, title: str):
+        self.title = title
+        self.count = 0  # Number of times the section has been exited
+        self.total_ns = 0  # Time spent in the section, in nanoseconds
+        self.self_ns = 0  # Time spent in the section but not in its subsections, in nanoseconds
+        self.max_ns = 0  # Longest time spent in the section at once, in nanoseconds
+        self.children: Dict[str, 'ProfileNode'] = {}
+
+    def walk(self, path: Tuple[str, ...] = ()) -> Iterator[Tuple[Tuple[str, ...], 'ProfileNode']]:
+        """
+        Iterate over all the nodes under this one (depth first), with their path of titles.
+        :param path: path of this node.
+        """
+        for child in self.children.values():
+            child_path = path + (child.title,)
+            yield child_path, child
+            yield from child.walk(child_path)
+
+
+class _TimerFrame:
+    __slots__ = ('parent', 'node', 'start', 'children_ns')
+
+    def __init__(self, parent: Optional['_TimerFrame'], node: ProfileNode, start: int):
+        self.parent = parent
+        self.node = node
+        self.start = start
+        self.children_ns = 0
+
+
+class SectionProfiler:
+    """
+    Profiler measuring with time.perf_counter_ns the time spent in each section. Like the sections themselves, the timers are
+    scoped to the current thread and asyncio task.
+    """
+
+    def __init__(self):
+        self.root = ProfileNode('')
+        self._frame: ContextVar[Optional[_TimerFrame]] = ContextVar(f'secprint_profiler_{id(self)}', default=None)
+        self._lock = threading.Lock()
+
+    def enter(self, title) -> None:
+        """
+        Start timing a section.
+        :param title: title of the section.
+        """
+        title = '' if title is None else title if isinstance(title, str) else str(title)
+        parent = self._frame.get()
+        parent_node = self.root if parent is None else parent.node
+        node = parent_node.children.get(title)
+        if node is None:
+            with self._lock:
+                node = parent_node.children.setdefault(title, ProfileNode(title))
+        self._frame.set(_TimerFrame(parent, node, time.perf_counter_ns()))
+
+    def exit(self) -> None:
+        """
+        Stop timing the last section entered.
+        """
+        end = time.perf_counter_ns()
+        frame = self._frame.get()
+        if frame is None:
+            return
+        duration = end - frame.start
+        node = frame.node
+        with self._lock:
+            node.count += 1
+            node.total_ns += duration
+            node.self_ns += max(duration - frame.children_ns, 0)
+            if duration > node.max_ns:
+                node.max_ns = duration
+        if frame.parent is not None:
+            frame.parent.children_ns += duration
+        self._frame.set(frame.parent)
+
+    def print_tree(self, color: Union[Color, str] = Color.CYAN, title: str = 'Section timings',
+                   printer: Optional[Printer] = None) -> None:
+        """
+        Print the aggregated timings through a printer, as nested sections. The sections used to print the tree are not timed.
+        :param color: color of the sections of the tree.
+        :param title: title of the section containing the tree.
+        :param printer: printer to print the tree with. Leave it as None to use the default printer of SectionPrinter.
+        """
+        if printer is None:
+            printer = SectionPrinter.self
+        profiler = printer.profiler
+        printer.set_profiler(None)
+        try:
+            with printer(title, color):
+                self._print_node(self.root, color, printer)
+        finally:
+            printer.set_profiler(profiler)
+
+    def _print_node(self, node: ProfileNode, color: Union[Color, str], printer: Printer) -> None:
+        for child in sorted(node.children.values(), key=lambda child_node: child_node.total_ns, reverse=True):
+            text = f'{child.title or "<untitled>"}: {child.count} × | total {format_duration(child.total_ns)} | ' \
+                   f'self {format_duration(child.self_ns)} | max {format_duration(child.max_ns)}'
+            if child.children:
+                with printer(text, color):
+                    self._print_node(child, color, printer)
+            else:
+                printer.print(text)
+
+    def collapsed_stacks(self) -> List[str]:
+        """
+        Get the timings in the collapsed stack format of flamegraph tools: one line per section with its path of titles
+        separated by semicolons and its self time in microseconds.
+        """
+        return [f'{";".join(title.replace(";", ",") for title in path)} {node.self_ns // 1000}'
+                for path, node in self.root.walk() if node.self_ns >= 1000]
+
+    def export_collapsed(self, file: Union[str, TextIO]) -> None:
+        """
+        Write the timings in the collapsed stack format of flamegraph tools (e.g. flamegraph.pl, inferno, speedscope).
+        :param file: path of the file to write or text file object to write to.
+        """
+        text = ''.join(line + '\n' for line in self.collapsed_stacks())
+        write_text(file, text)
+
+    def export_speedscope(self, file: Union[str, TextIO], name: str = 'secprint sections') -> None:
+        """
+        Write the timings as a speedscope profile (https://www.speedscope.app), where each section is a frame weighted by its self
+        time.
+        :param file: path of the file to write or text file object to write to.
+        :param name: name of the profile.
+        """
+        frames = []
+        frame_indices: Dict[str, int] = {}
+        samples = []
+        weights = []
+        for path, node in self.root.walk():
+            stack = []
+            for title in path:
+                index = frame_indices.get(title)
+                if index is None:
+                    index = frame_indices[title] = len(frames)
+                    frames.append({'name': title or '<untitled>'})
+                stack.append(index)
+            if node.self_ns:
+                samples.append(stack)
+                weights.append(node.self_ns)
+        profile = {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frames},
+            'profiles': [{'type': 'sampled', 'name': name, 'unit': 'nanoseconds', 'startValue': 0, 'endValue': sum(weights),
+                          'samples': samples, 'weights': weights}],
+            'name': name,
+            'exporter': 'secprint',
+        }
+        write_text(file, json.dumps(profile))
+
+
+def format_duration(duration_ns: int) -> str:
+    """
+    Format a duration in nanoseconds with three decimals, in the largest unit among seconds, milliseconds and microseconds
+    that keeps it above one.
+    """
+    if duration_ns >= 1_000_000_000:
+        return f'{duration_ns / 1_000_000_000:.3f} s'
+    if duration_ns >= 1_000_000:
+        return f'{duration_ns / 1_000_000:.3f} ms'
+    return f'{duration_ns / 1_000:.3f} µs'
+
+
+def write_text(file: Union[str, TextIO], text: str) -> None:
+    """
+    Write a text to a file, given either as the path of the file to (over)write or as a text file object.
+    """
+    if isinstance(file, str):
+        with open(file, 'w') as opened_file:
+            opened_file.write(text)
+    else:
+        file.write(text)
@@ -0,0 +1,407 @@
+"""
+Recording of the output of SectionPrinter as structured records, and offline rendering of the records.
+
+Instead of rendering the sections' headers and the ANSI escape sequences of every line, a RecordWriter stores each entered
+section, exited section and printed text as a record with a monotonic timestamp, either as JSON Lines or in a compact binary
+format. render_records replays a record file into exactly the text SectionPrinter would have written.
+
+Usage example::
+
+    with RecordWriter('run.jsonl') as writer:
+        Spt.set_record_sink(writer)
+        ...
+        Spt.set_record_sink(None)
+
+    render_records('run.jsonl')
+"""
+import atexit
+import itertools
+import json
+import struct
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from json.encoder import encode_basestring
+from typing import BinaryIO, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple, Union
+
+from secprint.secprint import RecordSink, SectionPrinter, _Section, _ROOT_SECTION, _format_text
+
+JSONL = 'jsonl'
+BINARY = 'binary'
+
+ENTER = 'enter'
+EXIT = 'exit'
+PRINT = 'print'
+
+# Binary format: a magic string, then records made of a header (payload size, kind) and a payload starting with the timestamp,
+# the id of the section and its depth. Strings are stored as their size followed by their UTF-8 encoding.
+_BINARY_MAGIC = b'SECPRINT-RECORDS-1\n'
+_RECORD_HEADER = struct.Struct('<IB')
+_COMMON = struct.Struct('<qQH')
+_ENTER = struct.Struct('<QH')
+_PRINT_FIELDS = struct.Struct('<BIII')
+_STRING_SIZE = struct.Struct('<I')
+_KINDS = (ENTER, EXIT, PRINT)
+_KIND_CODES = {kind: code for code, kind in enumerate(_KINDS)}
+_PRINT_CODE = _KIND_CODES[PRINT]
+# Print records are packed at once: record header, common fields, flags and sizes of the style, text and end strings
+_PRINT_HEAD = struct.Struct('<IBqQHBIII')
+
+
+class Record(NamedTuple):
+    """
+    Event read from a record file. The fields that do not apply to the kind of event are None.
+    """
+
+    kind: str  # ENTER, EXIT or PRINT
+    timestamp: int  # Value of time.monotonic_ns() when the event happened
+    section_id: int  # Identifier of the section entered, exited or in which the text is printed (0 for no section)
+    depth: int  # Depth of that section
+    parent_id: Optional[int] = None  # ENTER: identifier of the section containing the new one
+    header: Optional[str] = None  # ENTER: header of the section, including its color codes
+    path: Optional[Tuple[str, ...]] = None  # ENTER: titles of the sections containing the new one and of the new one
+    style: Optional[str] = None  # PRINT: escape sequences giving its color and effects to the text
+    text: Optional[str] = None  # PRINT: printed text
+    print_headers: Optional[bool] = None  # PRINT: print_headers argument of the print
+    rewrite: Optional[bool] = None  # PRINT: rewrite argument of the print
+    end: Optional[str] = None  # PRINT: end argument of the print
+
+
+# Writers holding buffered events, written when the interpreter exits. They are only weakly referenced, so that the writers that
+# are not used anymore can be collected.
+_PENDING_WRITERS = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_pending_writers() -> None:
+    for writer in list(_PENDING_WRITERS):
+        writer.flush()
+
+
+def _section_id(section: _Section) -> int:
+    # The identity of the section object is enough: the record entering a section always comes before its uses, so an identifier
+    # reused by a later section is simply redefined when that section is entered.
+    return 0 if section is _ROOT_SECTION else id(section)
+
+
+class RecordWriter(RecordSink):
+    """
+    Record sink writing the events to a file. Recording an event only captures its arguments and a timestamp: the events are
+    serialized by batches and written to the file with a single call per batch. Events can be recorded from any thread: they are
+    appended to a deque without taking a lock, and only the flushes are serialized.
+    """
+
+    def __init__(self, file: Union[str, BinaryIO], format: str = JSONL, buffer_size: int = 10000):
+        """
+        :param file: path of the file to write or binary file object to write to.
+        :param format: JSONL (one JSON object per line) or BINARY (compact length-prefixed records).
+        :param buffer_size: number of events buffered before they are serialized and written to the file.
+        """
+        if format not in (JSONL, BINARY):
+            raise ValueError(f'Unknown record format {format!r}, expected {JSONL!r} or {BINARY!r}')
+        self.format = format
+        self.buffer_size = buffer_size
+        self._owns_file = isinstance(file, str)
+        self._file: BinaryIO = open(file, 'wb') if self._owns_file else file
+        # Each event is stored as (kind, timestamp, section, style, text, print_headers, rewrite, end), the sections being kept
+        # alive until the event is serialized so that their identifiers stay valid
+        self._events: Deque[tuple] = deque()
+        # Sections whose enter record has been written and whose exit record has not, by identifier. Holding them keeps their
+        # identifiers from being reused by other sections while they are open.
+        self._entered: Dict[int, _Section] = {}
+        self._flush_lock = threading.Lock()
+        if format == BINARY:
+            self._file.write(_BINARY_MAGIC)
+        _PENDING_WRITERS.add(self)
+
+    def on_enter(self, section: _Section) -> None:
+        self._events.append((ENTER, time.monotonic_ns(), section))
+        if len(self._events) >= self.buffer_size:
+            self.flush()
+
+    def on_exit(self, section: _Section) -> None:
+        self._events.append((EXIT, time.monotonic_ns(), section))
+        if len(self._events) >= self.buffer_size:
+            self.flush()
+
+    def on_print(self, section: _Section, style: str, text: str, print_headers: bool, rewrite: bool, end: str) -> None:
+        events = self._events
+        events.append((PRINT, time.monotonic_ns(), section, style, text, print_headers, rewrite, end))
+        if len(events) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Serialize all the buffered events and write them to the file.
+        """
+        with self._flush_lock:
+            events = self._events
+            # Only pop what is there now: other threads may keep recording events while the batch is serialized
+            n_events = len(events)
+            if n_events:
+                batch = [events.popleft() for _ in range(n_events)]
+                if self.format == JSONL:
+                    data = _serialize_jsonl(batch, self._entered).encode()
+                else:
+                    data = _serialize_binary(batch, self._entered)
+                self._file.write(data)
+            self._file.flush()
+
+    def close(self) -> None:
+        """
+        Write all the buffered records, stop watching the interpreter exit and close the file if it has been opened by the writer.
+        """
+        self.flush()
+        _PENDING_WRITERS.discard(self)
+        if self._owns_file:
+            self._file.close()
+
+    def __del__(self) -> None:
+        # A writer collected before being closed still writes the events it holds
+        if self._events:
+            self.flush()
+
+    def __enter__(self) -> 'RecordWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def _serialize_jsonl(events: List[tuple], entered: Dict[int, _Section]) -> str:
+    # The fields that only depend on the section, the style and the options of a print are formatted once per batch, and reused
+    # right away by the following prints sharing them
+    fields = {}
+    last_key = (None,) * 5
+    head = tail = None
+    lines = []
+    for event in events:
+        if event[0] is PRINT:
+            _, timestamp, section, style, text, print_headers, rewrite, end = event
+            if (section is not last_key[0] or style is not last_key[1] or print_headers is not last_key[2]
+                    or rewrite is not last_key[3] or end is not last_key[4]):
+                if section is not last_key[0]:
+                    for missing in _missing_sections(section, entered):
+                        lines.append(_jsonl_enter(timestamp, missing))
+                last_key = (section, style, print_headers, rewrite, end)
+                print_fields = fields.get(last_key)
+                if print_fields is None:
+                    print_fields = fields[last_key] = _jsonl_print_fields(section, style, print_headers, rewrite, end)
+                head, tail = print_fields
+            lines.append(f'{{"event":"print","timestamp":{timestamp}{head}{encode_basestring(text)}{tail}')
+            continue
+        kind, timestamp, section = event
+        if kind is ENTER:
+            for missing in _missing_sections(section.parent, entered):
+                lines.append(_jsonl_enter(timestamp, missing))
+            entered[id(section)] = section
+            lines.append(_jsonl_enter(timestamp, section))
+        elif entered.pop(id(section), None) is not None:
+            lines.append(f'{{"event":"exit","timestamp":{timestamp},"id":{id(section)},"depth":{section.depth}}}\n')
+        last_key = (None,) * 5
+    return ''.join(lines)
+
+
+def _jsonl_enter(timestamp: int, section: _Section) -> str:
+    return (f'{{"event":"enter","timestamp":{timestamp},"id":{id(section)},"depth":{section.depth},'
+            f'"parent":{_section_id(section.parent)},"header":{encode_basestring(section.header)},'
+            f'"path":[{",".join(map(encode_basestring, section.path))}]}}\n')
+
+
+def _missing_sections(section: _Section, entered: Dict[int, _Section]) -> List[_Section]:
+    """
+    Get the sections containing a section, and the section itself, whose enter records have not been written, from the
+    outermost one, and mark them as entered. They were entered before the record sink was set.
+    """
+    missing = []
+    while section is not _ROOT_SECTION and entered.get(id(section)) is not section:
+        missing.append(section)
+        section = section.parent
+    missing.reverse()
+    for section in missing:
+        entered[id(section)] = section
+    return missing
+
+
+def _jsonl_print_fields(section: _Section, style: str, print_headers: bool, rewrite: bool, end: str) -> Tuple[str, str]:
+    """
+    Get the JSON fields of a print record written between the timestamp and the text, and after the text.
+    """
+    head = f',"id":{_section_id(section)},"depth":{section.depth},"text":'
+    # The fields having their default value (no style, print_headers, no rewrite, end of line) are omitted
+    tail = f',"style":{encode_basestring(style)}' if style else ''
+    if not print_headers or rewrite or end != '\n':
+        tail += f',"print_headers":{"true" if print_headers else "false"},"rewrite":{"true" if rewrite else "false"},' \
+                f'"end":{encode_basestring(end)}'
+    return head, tail + '}\n'
+
+
+def _serialize_binary(events: List[tuple], entered: Dict[int, _Section]) -> bytearray:
+    # The fields that only depend on the section, the style and the options of a print are encoded once per batch, and reused
+    # right away by the following prints sharing them
+    fields = {}
+    last_key = (None,) * 5
+    size = section_id = depth = flags = style_size = end_size = style_bytes = end_bytes = None
+    data = bytearray()
+    pack = _PRINT_HEAD.pack
+    for event in events:
+        if event[0] is PRINT:
+            _, timestamp, section, style, text, print_headers, rewrite, end = event
+            if (section is not last_key[0] or style is not last_key[1] or print_headers is not last_key[2]
+                    or rewrite is not last_key[3] or end is not last_key[4]):
+                if section is not last_key[0]:
+                    for missing in _missing_sections(section, entered):
+                        data += _binary_enter(timestamp, missing)
+                last_key = (section, style, print_headers, rewrite, end)
+                print_fields = fields.get(last_key)
+                if print_fields is None:
+                    print_fields = fields[last_key] = _binary_print_fields(section, style, print_headers, rewrite, end)
+                size, section_id, depth, flags, style_size, end_size, style_bytes, end_bytes = print_fields
+            text = text.encode()
+            text_size = len(text)
+            data += pack(size + text_size, _PRINT_CODE, timestamp, section_id, depth, flags, style_size, text_size, end_size)
+            data += style_bytes
+            data += text
+            data += end_bytes
+            continue
+        kind, timestamp, section = event
+        if kind is ENTER:
+            for missing in _missing_sections(section.parent, entered):
+                data += _binary_enter(timestamp, missing)
+            entered[id(section)] = section
+            data += _binary_enter(timestamp, section)
+        elif entered.pop(id(section), None) is not None:
+            data += _RECORD_HEADER.pack(_COMMON.size, _KIND_CODES[EXIT])
+            data += _COMMON.pack(timestamp, id(section), section.depth)
+        last_key = (None,) * 5
+    return data
+
+
+def _binary_enter(timestamp: int, section: _Section) -> bytes:
+    payload = [_COMMON.pack(timestamp, id(section), section.depth), _ENTER.pack(_section_id(section.parent), len(section.path)),
+               _pack_string(section.header)]
+    payload.extend(map(_pack_string, section.path))
+    payload = b''.join(payload)
+    return _RECORD_HEADER.pack(len(payload), _KIND_CODES[ENTER]) + payload
+
+
+def _binary_print_fields(section: _Section, style: str, print_headers: bool, rewrite: bool, end: str) -> tuple:
+    """
+    Get the fields of a print record that do not depend on its text nor on its timestamp: the size of the payload without the
+    text, the id and depth of the section, the flags, the sizes of the style and of the end, and their encodings.
+    """
+    style_bytes = style.encode()
+    end_bytes = end.encode()
+    return (_PRINT_HEAD.size - _RECORD_HEADER.size + len(style_bytes) + len(end_bytes), _section_id(section), section.depth,
+            print_headers | rewrite << 1, len(style_bytes), len(end_bytes), style_bytes, end_bytes)
+
+
+def _pack_string(text: str) -> bytes:
+    encoded = text.encode()
+    return _STRING_SIZE.pack(len(encoded)) + encoded
+
+
+def read_records(file: Union[str, BinaryIO]) -> Iterator[Record]:
+    """
+    Read the records of a file written by a RecordWriter, one at a time. The format is detected automatically.
+    :param file: path of the file to read or binary file object to read from.
+    """
+    if isinstance(file, str):
+        with open(file, 'rb') as opened_file:
+            yield from read_records(opened_file)
+        return
+
+    head = file.read(len(_BINARY_MAGIC))
+    if head == _BINARY_MAGIC:
+        yield from _read_binary_records(file)
+    else:
+        yield from _read_jsonl_records(itertools.chain([head + file.readline()], file))
+
+
+def _read_jsonl_records(lines: Iterable[bytes]) -> Iterator[Record]:
+    for line in lines:
+        if not line.strip():
+            continue
+        event = json.loads(line)
+        kind = event['event']
+        if kind == ENTER:
+            yield Record(ENTER, event['timestamp'], event['id'], event['depth'], parent_id=event['parent'],
+                         header=event['header'], path=tuple(event['path']))
+        elif kind == EXIT:
+            yield Record(EXIT, event['timestamp'], event['id'], event['depth'])
+        else:
+            yield Record(PRINT, event['timestamp'], event['id'], event['depth'], style=event.get('style', ''), text=event['text'],
+                         print_headers=event.get('print_headers', True), rewrite=event.get('rewrite', False),
+                         end=event.get('end', '\n'))
+
+
+def _read_binary_records(file: BinaryIO) -> Iterator[Record]:
+    while True:
+        record_header = file.read(_RECORD_HEADER.size)
+        if len(record_header) < _RECORD_HEADER.size:
+            return
+        size, kind_code = _RECORD_HEADER.unpack(record_header)
+        payload = file.read(size)
+        kind = _KINDS[kind_code]
+        timestamp, section_id, depth = _COMMON.unpack_from(payload)
+        offset = _COMMON.size
+        if kind == ENTER:
+            parent_id, path_length = _ENTER.unpack_from(payload, offset)
+            strings = _unpack_strings(payload, offset + _ENTER.size, path_length + 1)
+            yield Record(ENTER, timestamp, section_id, depth, parent_id=parent_id, header=strings[0], path=tuple(strings[1:]))
+        elif kind == EXIT:
+            yield Record(EXIT, timestamp, section_id, depth)
+        else:
+            flags, style_size, text_size, end_size = _PRINT_FIELDS.unpack_from(payload, offset)
+            style, text, end = _split_strings(payload, offset + _PRINT_FIELDS.size, (style_size, text_size, end_size))
+            yield Record(PRINT, timestamp, section_id, depth, style=style, text=text, print_headers=bool(flags & 1),
+                         rewrite=bool(flags & 2), end=end)
+
+
+def _unpack_strings(payload: bytes, offset: int, n_strings: int) -> List[str]:
+    strings = []
+    for _ in range(n_strings):
+        size, = _STRING_SIZE.unpack_from(payload, offset)
+        offset += _STRING_SIZE.size
+        strings.append(payload[offset:offset + size].decode())
+        offset += size
+    return strings
+
+
+def _split_strings(payload: bytes, offset: int, sizes: Tuple[int, ...]) -> List[str]:
+    strings = []
+    for size in sizes:
+        strings.append(payload[offset:offset + size].decode())
+        offset += size
+    return strings
+
+
+def render_records(file: Union[str, BinaryIO], stream: Optional[TextIO] = None, coloring: Optional[bool] = None,
+                   batch_size: int = 10000) -> None:
+    """
+    Replay a record file, writing exactly the text that SectionPrinter would have written when the records were made.
+    :param file: path of the file to read or binary file object to read from.
+    :param stream: stream to write to. Leave it as None to write to sys.stdout.
+    :param coloring: if set to false, all colors are removed. Leave it as None to use the coloring parameter of SectionPrinter.
+    :param batch_size: number of printed texts written at once.
+    """
+    if coloring is None:
+        coloring = SectionPrinter.self.coloring
+    stream = stream or sys.stdout
+    sections: Dict[int, _Section] = {0: _ROOT_SECTION}
+    chunks = []
+    for record in read_records(file):
+        if record.kind == PRINT:
+            # A section never entered in the file (e.g. a truncated file) gets no headers rather than failing the whole rendering
+            section = sections.get(record.section_id, _ROOT_SECTION)
+            chunks.append(_format_text(section, record.text, record.style, coloring, record.print_headers, record.rewrite,
+                                       record.end)[0])
+            if len(chunks) >= batch_size:
+                stream.write(''.join(chunks))
+                chunks.clear()
+        elif record.kind == ENTER:
+            parent = sections.get(record.parent_id, _ROOT_SECTION)
+            sections[record.section_id] = parent.push(record.header, record.path[-1])
+    stream.write(''.join(chunks))
@@ -1,5 +1,38 @@
+import inspect
+import logging
+import math
+import os
+import re
+import shutil
+import signal
+import sys
+import threading
+import time
+import unicodedata
+from contextvars import ContextVar
 from enum import Enum
-from typing import Union, Optional
+from functools import lru_cache, partial, wraps
+from typing import Any, BinaryIO, Callable, Hashable, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple, Union
+
+from secprint.output import AsyncWriter, BinaryOutput, FlushPolicy, OutputBuffer, OverflowPolicy, RingBuffer, ThreadedWriter
+
+# Any CSI sequence: ESC [, parameter bytes, intermediate bytes and a final byte
+_ANSI_ESCAPE = re.compile('\x1b\\[[0-?]*[ -/]*[@-~]')
+_ANSI_ESCAPE_BYTES = re.compile(b'\x1b\\[[0-?]*[ -/]*[@-~]')
+# Escape sequences longer than this are not expected in practice
+_MAX_ESCAPE_LENGTH = 64
+# Texts up to this length (headers, titles, short messages) have their stripped version memoized
+_CACHED_TEXT_MAX_LENGTH = 256
+# Number of characters of a text written at once by SectionPrinter.print_lines
+_TEXT_BLOCK_SIZE = 1 << 16
+# Wrapped lines are never made narrower than this, even when the headers take most of the terminal width
+_MIN_WRAP_WIDTH = 20
+_END_BYTES = b'\033[0m'
+
+
+@lru_cache(maxsize=4096)
+def _remove_colors_cached(text: str) -> str:
+    return _ANSI_ESCAPE.sub('', text)
 
 
 class Color(str, Enum):
@@ -34,9 +67,10 @@ class Color(str, Enum):
     DARK_CYAN = '\033[36m'
 
     @staticmethod
+    @lru_cache(maxsize=256)
     def from_string(color: str) -> 'Color':
         """
-        Get a Color from a string. For example "dark_green" will get you the color DARK_GREEN.
+        Get a Color from a string. For example "dark_green" will get you the color DARK_GREEN. The results are memoized.
         :param color: color stored as the string name of the color.
         """
         return getattr(Color, color.upper(), '')
@@ -44,12 +78,44 @@ class Color(str, Enum):
     @staticmethod
     def remove_colors(text: str) -> str:
         """
-        Return a new text corresponding to the input text but with all colors removed.
+        Return a new text corresponding to the input text but with all colors removed. Any ANSI CSI sequence is removed, including
+        the ones that are not members of Color (256-color codes, combined codes such as '\\033[1;31m', cursor movements, ...).
         :param text: text from which to remove the colors
         """
-        for color in Color:
-            text = text.replace(color, '')
-        return text
+        if '\x1b' not in text:
+            return text
+        if len(text) <= _CACHED_TEXT_MAX_LENGTH:
+            return _remove_colors_cached(text)
+        return _ANSI_ESCAPE.sub('', text)
+
+    @staticmethod
+    def remove_colors_from_file(source: Union[BinaryIO, TextIO], destination: Union[BinaryIO, TextIO],
+                                chunk_size: int = 1 << 20) -> None:
+        """
+        Copy the content of a file (or any file-like object) to another one with all colors removed. The content is processed by
+        chunks so that arbitrarily large files can be stripped with a constant memory usage.
+        :param source: file to read from. It can be opened either in text or in binary mode.
+        :param destination: file to write to. It must be opened in the same mode as the source.
+        :param chunk_size: number of characters (or bytes) read at once.
+        """
+        tail = None
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            if tail:
+                chunk = tail + chunk
+            escape, pattern = (b'\x1b', _ANSI_ESCAPE_BYTES) if isinstance(chunk, bytes) else ('\x1b', _ANSI_ESCAPE)
+
+            # An escape sequence may be cut by the end of the chunk: keep it for the next one
+            last_escape = chunk.rfind(escape, max(0, len(chunk) - _MAX_ESCAPE_LENGTH))
+            if last_escape != -1 and pattern.match(chunk, last_escape) is None:
+                chunk, tail = chunk[:last_escape], chunk[last_escape:]
+            else:
+                tail = None
+            destination.write(pattern.sub(escape[:0], chunk))
+        if tail:
+            destination.write(tail)
 
     @staticmethod
     def rainbow(text: str) -> str:
@@ -57,156 +123,1040 @@ class Color(str, Enum):
         Return a new text corresponding to the input text colored as a rainbow
         :param text: text to color.
         """
-        rainbow_colors = [Color.RED, Color.YELLOW, Color.GREEN, Color.CYAN, Color.BLUE, Color.PURPLE]
-        result = ''
-        i = 0
-        for char in text:
-            result = result + rainbow_colors[i % len(rainbow_colors)] + char + Color.END
-            if char != ' ':
-                i += 1
-        return result
+        if len(text) <= _CACHED_TEXT_MAX_LENGTH:
+            return _cycle_cached(text, _RAINBOW_PALETTE)
+        return _cycle(text, _RAINBOW_PALETTE)
 
+    @staticmethod
+    def cycle(text: str, palette: Sequence[Union['Color', str]]) -> str:
+        """
+        Return a new text corresponding to the input text where each character takes the next color of the palette, cycling
+        through it. Spaces take the current color without moving forward in the palette. The results for short texts are
+        memoized, so coloring the same text several times (a section title for instance) is cheap.
+        :param text: text to color.
+        :param palette: colors to use, as Colors, names of colors (e.g. 'dark_green') or raw ANSI escape sequences.
+        """
+        if len(text) <= _CACHED_TEXT_MAX_LENGTH:
+            return _cycle_cached(text, _palette_to_tuple(palette))
+        return _cycle(text, _palette_to_tuple(palette))
 
-class SectionPrinter:
     @staticmethod
-    def check_init() -> None:
+    def gradient(text: str, palette: Sequence[Union['Color', str]]) -> str:
         """
-        Verify that the OutputDecorator is correctly initialized.
+        Return a new text corresponding to the input text split in as many contiguous parts as there are colors in the palette,
+        each part being colored with the corresponding color. Spaces are not taken into account when splitting the text. The
+        results for short texts are memoized.
+        :param text: text to color.
+        :param palette: colors to use, from the first to the last character, as Colors, names of colors (e.g. 'dark_green') or raw
+        ANSI escape sequences.
         """
+        if len(text) <= _CACHED_TEXT_MAX_LENGTH:
+            return _gradient_cached(text, _palette_to_tuple(palette))
+        return _gradient(text, _palette_to_tuple(palette))
+
+
+_RAINBOW_PALETTE = (Color.RED, Color.YELLOW, Color.GREEN, Color.CYAN, Color.BLUE, Color.PURPLE)
+
+
+def _palette_to_tuple(palette: Sequence[Union[Color, str]]) -> Tuple[str, ...]:
+    return tuple(color if isinstance(color, Color) or color.startswith('\x1b') else Color.from_string(color) for color in palette)
+
+
+def _cycle(text: str, palette: Tuple[str, ...]) -> str:
+    if not palette:
+        return text
+    n_colors = len(palette)
+    result = []
+    i = 0
+    for char in text:
+        result.append(palette[i % n_colors] + char + Color.END)
+        if char != ' ':
+            i += 1
+    return ''.join(result)
+
+
+def _gradient(text: str, palette: Tuple[str, ...]) -> str:
+    n_chars = len(text) - text.count(' ')
+    if not palette or n_chars == 0:
+        return text
+    n_colors = len(palette)
+    result = []
+    part_start = 0
+    current = 0
+    i = 0
+    for position, char in enumerate(text):
+        if char != ' ':
+            color_index = i * n_colors // n_chars
+            if color_index != current:
+                result.append(palette[current] + text[part_start:position] + Color.END)
+                part_start = position
+                current = color_index
+            i += 1
+    result.append(palette[current] + text[part_start:] + Color.END)
+    return ''.join(result)
+
+
+# Only the texts of at most _CACHED_TEXT_MAX_LENGTH characters are memoized, so that the cache stays small
+_cycle_cached = lru_cache(maxsize=1024)(_cycle)
+_gradient_cached = lru_cache(maxsize=1024)(_gradient)
+
+
+class _WidthTable(dict):
+    """
+    Table of the number of terminal columns taken by each character, filled as new characters are met.
+    """
+
+    def __missing__(self, char: str) -> int:
+        if char.isascii():
+            # Like in the ASCII fast paths, which do not measure each character: ASCII control characters (e.g. tabulations)
+            # take one column too
+            width = 1
+        elif unicodedata.combining(char) or unicodedata.category(char) in ('Cc', 'Cf', 'Me', 'Mn'):
+            width = 0
+        elif unicodedata.east_asian_width(char) in ('F', 'W'):
+            width = 2
+        else:
+            width = 1
+        self[char] = width
+        return width
+
+
+_CHAR_WIDTHS = _WidthTable()
+
+
+def _display_width(text: str) -> int:
+    """
+    Number of terminal columns taken by a text: escape sequences take none, ASCII characters (control characters included) take
+    one, and wide (East Asian) characters take two.
+    """
+    if '\x1b' in text:
+        text = Color.remove_colors(text)
+    if text.isascii():
+        return len(text)
+    return sum(map(_CHAR_WIDTHS.__getitem__, text))
+
+
+def _wrap_line(line: str, width: int) -> List[str]:
+    """
+    Cut a line into pieces of at most width columns, at the last space before the limit when there is one. Escape sequences are
+    kept intact and do not count in the width.
+    """
+    pieces = []
+    start = 0  # Index of the first character of the current piece
+    if line.isascii() and '\x1b' not in line:
+        # One column per character: the cuts can be found without measuring each character
+        while len(line) - start > width:
+            space = line.rfind(' ', start + 1, start + width + 1)
+            if space < 0:
+                pieces.append(line[start:start + width])
+                start += width
+            else:
+                pieces.append(line[start:space])
+                start = space + 1
+        pieces.append(line[start:])
+        return pieces
+
+    space = -1  # Index of the last space of the current piece
+    space_columns = 0  # Columns of the current piece before its last space
+    visible_end = 0  # Index following the last character of the current piece that is not part of an escape sequence
+    columns = 0
+    i = 0
+    length = len(line)
+    while i < length:
+        char = line[i]
+        if char == '\x1b':
+            escape = _ANSI_ESCAPE.match(line, i)
+            if escape is not None:
+                i = escape.end()
+                continue
+        char_width = _CHAR_WIDTHS[char]
+        if columns + char_width > width and columns > 0:
+            if char == ' ':
+                # The piece fits exactly, the space is dropped
+                pieces.append(line[start:i])
+                start = i + 1
+                space = -1
+                columns = 0
+                i += 1
+                continue
+            if space >= 0 and space_columns > 0:
+                pieces.append(line[start:space])
+                start = space + 1
+                columns -= space_columns + 1
+            else:
+                # No space to cut at: the escape sequences preceding the character go with it in the next piece
+                pieces.append(line[start:visible_end])
+                start = visible_end
+                columns = 0
+            space = -1
+            # The rest of the piece may still be too wide for the character: check again
+            continue
+        if char == ' ':
+            space = i
+            space_columns = columns
+        columns += char_width
+        i += 1
+        visible_end = i
+    if columns == 0 and pieces:
+        # Only escape sequences are left: they end the last piece instead of making a line of their own
+        pieces[-1] += line[start:]
+    else:
+        pieces.append(line[start:])
+    return pieces
+
+
+def _wrap(text: str, width: int) -> str:
+    """
+    Cut the lines of a text that are wider than width columns into several lines.
+    """
+    lines = text.split('\n')
+    wrapped = []
+    for line in lines:
+        if len(line) <= width and line.isascii() or _display_width(line) <= width:
+            wrapped.append(line)
+        else:
+            wrapped.extend(_wrap_line(line, width))
+    return '\n'.join(wrapped)
+
+
+class _TerminalWidth:
+    """
+    Width of the terminal, only queried again when the terminal is resized. Where resizes cannot be watched (no SIGWINCH signal,
+    or wrapping enabled outside of the main thread), it is queried at most once per second.
+    """
+
+    def __init__(self):
+        self.width: Optional[int] = None
+        self.checked = -math.inf
+        self.watching = False
+
+    def get(self) -> int:
+        if self.width is None or (not self.watching and time.monotonic() - self.checked >= 1):
+            self.width = shutil.get_terminal_size().columns
+            self.checked = time.monotonic()
+        return self.width
+
+    def watch(self) -> None:
+        """
+        Forget the width whenever the terminal is resized, keeping any SIGWINCH handler already installed.
+        """
+        if self.watching or not hasattr(signal, 'SIGWINCH') or threading.current_thread() is not threading.main_thread():
+            return
+        previous = signal.getsignal(signal.SIGWINCH)
+
+        def on_resize(signum, frame) -> None:
+            self.width = None
+            if callable(previous):
+                previous(signum, frame)
+
+        signal.signal(signal.SIGWINCH, on_resize)
+        self.watching = True
+
+
+_TERMINAL_WIDTH = _TerminalWidth()
+
+
+class _Section:
+    """
+    Immutable node of the stack of sections, caching the cumulative prefix of headers to print before each line. Entering a
+    section only creates its node: the headers and titles of all the sections containing it are linked through the parents, and
+    only gathered into tuples when they are asked for.
+    """
+
+    __slots__ = ('parent', 'header', 'title', 'prefix', 'plain_prefix', 'depth', 'width', 'prefix_bytes', 'plain_prefix_bytes',
+                 '_headers', '_path')
+
+    def __init__(self, parent: Optional['_Section'], header: str, title: str, prefix: str, plain_prefix: str, depth: int,
+                 width: int, prefix_bytes: bytes, plain_prefix_bytes: bytes):
+        self.parent = parent
+        self.header = header
+        self.title = title
+        self.prefix = prefix
+        self.plain_prefix = plain_prefix
+        self.depth = depth
+        self.width = width  # Number of terminal columns taken by the prefix
+        self.prefix_bytes = prefix_bytes  # UTF-8 encoding of the prefix, for the printers writing bytes
+        self.plain_prefix_bytes = plain_prefix_bytes
+        self._headers: Optional[Tuple[str, ...]] = None if parent is not None else ()
+        self._path: Optional[Tuple[str, ...]] = None if parent is not None else ()
+
+    @property
+    def headers(self) -> Tuple[str, ...]:
+        """
+        Headers of the sections containing this one and of this one, from the outermost one.
+        """
+        if self._headers is None:
+            self._gather('_headers', 'header')
+        return self._headers
+
+    @property
+    def path(self) -> Tuple[str, ...]:
+        """
+        Titles of the sections containing this one and of this one, from the outermost one.
+        """
+        if self._path is None:
+            self._gather('_path', 'title')
+        return self._path
+
+    def _gather(self, cache: str, field: str) -> None:
+        """
+        Build and cache the tuple of a field of this section and of the sections containing it, starting from the closest section
+        whose tuple is already known.
+        """
+        missing = []
+        section = self
+        while getattr(section, cache) is None:
+            missing.append(section)
+            section = section.parent
+        values = getattr(section, cache)
+        for section in reversed(missing):
+            values += (getattr(section, field),)
+            setattr(section, cache, values)
+
+    def push(self, header: str, title: str = '') -> '_Section':
+        """
+        Get the section nested in this one with the given (colored) header.
+        :param header: header of the new section, including its color codes.
+        :param title: title of the new section.
+        """
+        plain_header = Color.remove_colors(header)
+        return _Section(self, header, title, self.prefix + header, self.plain_prefix + plain_header, self.depth + 1,
+                        self.width + _display_width(header), self.prefix_bytes + header.encode(),
+                        self.plain_prefix_bytes + plain_header.encode())
+
+    def pop(self) -> '_Section':
+        """
+        Get the section containing this one. Popping the root section gives the root section itself.
+        """
+        return self.parent if self.parent is not None else self
+
+
+_ROOT_SECTION = _Section(None, '', '', '', '', 0, 0, b'', b'')
+
+
+class Style(str):
+    """
+    Immutable color and effects of a text, stored as the escape sequences to print before it. Styles are interned: creating a
+    style that already exists returns the same object, so its escape sequences are only assembled once, and printing with a
+    style does not cost any work per line. Only the latest styles are kept interned, so that creating many styles (e.g. a
+    gradient of 24-bit colors) does not hold on to all of them. Besides the members of Color, the color can be any of the 256
+    colors of the terminal palette or any 24-bit color, for the terminals supporting them.
+
+    Usage example::
+
+        ORANGE = Style((255, 136, 0), bold=True)
+        with Spt('Section', ORANGE):
+            Spt.print('text', Style(208))
+    """
+
+    def __new__(cls, color: Union[Color, str, int, Tuple[int, int, int]] = Color.NONE, bold: bool = False,
+                underline: bool = False, blink: bool = False) -> 'Style':
+        """
+        :param color: member of Color, name of a member of Color (e.g. 'dark_green'), index of a color of the 256-color palette,
+        (red, green, blue) tuple or hexadecimal string (e.g. '#ff8800') of a 24-bit color, or raw escape sequence. It can also
+        be a Style, whose effects are kept.
+        :param bold: if set to true, the text is printed in boldface.
+        :param underline: if set to true, the text is printed underlined.
+        :param blink: if set to true, the text is blinking (not compatible with all consoles).
+        """
+        key = (color, bold, underline, blink)
+        style = _STYLES.get(key)
+        if style is not None:
+            return style
+
+        # The same style given in another form (a name instead of a Color, a Style with effects, ...) is the same object
+        if isinstance(color, Style):
+            bold, underline, blink = bold or color.bold, underline or color.underline, blink or color.blink
+            color = color.color
+        elif isinstance(color, str) and not isinstance(color, Color) and not color.startswith('\x1b'):
+            color = _parse_color(color)
+        attributes = (color, bold, underline, blink)
+        style = _STYLES.get(attributes)
+        if style is None:
+            style = str.__new__(cls, _color_sequence(color) + (Color.BOLD if bold else '')
+                                + (Color.UNDERLINE if underline else '') + (Color.BLINK if blink else ''))
+            for name, value in zip(('color', 'bold', 'underline', 'blink'), attributes):
+                object.__setattr__(style, name, value)
+            object.__setattr__(style, 'encoded', str.encode(style))  # For the printers writing bytes
+            style = _intern_style(attributes, style)
+        return _intern_style(key, style)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('Style objects are immutable')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError('Style objects are immutable')
+
+    def __reduce__(self):
+        return Style, (self.color, self.bold, self.underline, self.blink)
+
+    def __repr__(self) -> str:
+        effects = ''.join(f', {name}=True' for name in ('bold', 'underline', 'blink') if getattr(self, name))
+        return f'Style({self.color!r}{effects})'
+
+
+# Interned styles, by the arguments they were created with, from the oldest to the newest
+_STYLES = {}
+_STYLES_LOCK = threading.Lock()
+# Maximum number of entries of _STYLES: the 24-bit colors alone make millions of styles
+_MAX_STYLES = 4096
+
+
+def _intern_style(key: tuple, style: Style) -> Style:
+    """
+    Store a style under a key unless a style is already stored under it, and get the stored style. Past _MAX_STYLES entries, the
+    oldest ones are dropped: their styles stay valid, and are only assembled again if they are created again.
+    """
+    with _STYLES_LOCK:
+        style = _STYLES.setdefault(key, style)
+        while len(_STYLES) > _MAX_STYLES:
+            del _STYLES[next(iter(_STYLES))]
+    return style
+
+
+def _parse_color(color: str) -> Union[Color, Tuple[int, int, int]]:
+    """
+    Get the Color named by a string, or the (red, green, blue) tuple of a hexadecimal color. Unknown names give no color.
+    """
+    if color.startswith('#'):
         try:
-            SectionPrinter.self.is_init
-        except AttributeError:
-            SectionPrinter.reset()
-            SectionPrinter.self.is_init = True
+            if len(color) != 7:
+                raise ValueError
+            return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+        except ValueError:
+            raise ValueError(f'invalid hexadecimal color: {color}') from None
+    return Color.from_string(color) or Color.NONE
 
-    @staticmethod
-    def self() -> None:
+
+def _color_sequence(color: Union[Color, str, int, Tuple[int, int, int]]) -> str:
+    """
+    Get the escape sequence giving a color to a text, from a Color, a raw escape sequence, an index of the 256-color palette or a
+    (red, green, blue) tuple.
+    """
+    if isinstance(color, str):
+        return color.value if isinstance(color, Color) else color
+    if isinstance(color, int) and not isinstance(color, bool):
+        if not 0 <= color <= 255:
+            raise ValueError(f'256-color palette index out of range: {color}')
+        return f'\033[38;5;{color}m'
+    if isinstance(color, tuple) and len(color) == 3 and all(isinstance(c, int) and 0 <= c <= 255 for c in color):
+        return f'\033[38;2;{color[0]};{color[1]};{color[2]}m'
+    raise ValueError(f'invalid color: {color!r}')
+
+
+def _style(color: Union[Color, Style, str, int, Tuple[int, int, int]], bold: bool = False, underline: bool = False,
+           blink: bool = False) -> str:
+    """
+    Get the style made of a color and some effects, straight from the interned styles when it already exists. The empty style is
+    returned as a plain empty string, which string concatenations skip without copying the other operand.
+    """
+    style = _STYLES.get((color, bold, underline, blink))
+    if style is None:
+        style = Style(color, bold, underline, blink)
+    return style or ''
+
+
+# Colors of the texts printed with a level, from the highest level. Custom levels get the color of the closest level below them.
+_LEVEL_COLORS = ((logging.ERROR, Color.RED), (logging.WARNING, Color.YELLOW), (logging.INFO, Color.NONE),
+                 (logging.NOTSET, Color.DARK_GRAY))
+
+
+def _level_color(level: int) -> Color:
+    """
+    Get the color of the texts printed with a level.
+    """
+    for minimum, color in _LEVEL_COLORS:
+        if level >= minimum:
+            return color
+    return Color.DARK_GRAY
+
+
+def _format_text(section: _Section, text: str, style: str, coloring: bool, print_headers: bool = True, rewrite: bool = False,
+                 end: str = '\n') -> Tuple[str, int]:
+    """
+    Build the string made of the sections' headers and the input text, exactly as it should be written to the output.
+    :param section: section in which the text is printed.
+    :param text: text to be printed. It can contain several lines.
+    :param style: escape sequences to print before each line of the text.
+    :param coloring: if set to false, all colors are removed.
+    :param print_headers: if set to true, all section headers will be printed before each line of the text.
+    :param rewrite: if set to true, rewrites over the current line instead of printing a new line.
+    :param end: character to print at the end of the text.
+    :return: the formatted string and the number of lines it contains.
+    """
+    if coloring:
+        prefix = section.prefix
+        style_end = Color.END
+    else:
+        prefix = section.plain_prefix
+        text = Color.remove_colors(text)  # we still remove the colors in case the user included them in the text itself
+        style = style_end = ''
+
+    start = ('\r' if rewrite else '') + (prefix if print_headers else '') + style
+    if '\n' in text:
+        lines = text.split('\n')
+        return ''.join([start + line + style_end + '\n' for line in lines[:-1]]) + start + lines[-1] + style_end + end, len(lines)
+    return start + text + style_end + end, 1
+
+
+def _split_blocks(text: str, block_size: int) -> Iterator[str]:
+    """
+    Iterate over blocks of about block_size characters of a text, cut at line breaks, which are removed. A final line break does
+    not start a new line.
+    """
+    start = 0
+    length = len(text)
+    while start < length:
+        end = start + block_size
+        cut = -1
+        if end < length:
+            cut = text.rfind('\n', start, end)
+            if cut < 0:
+                cut = text.find('\n', end)
+        if cut < 0:
+            cut = length - 1 if text.endswith('\n') else length
+        yield text[start:cut]
+        start = cut + 1
+
+
+def _join_blocks(lines: Iterable[Any], block_size: int) -> Iterator[str]:
+    """
+    Iterate over blocks of block_size lines of an iterable, joined by line breaks. The line break ending each line is removed.
+    """
+    block = []
+    for line in lines:
+        if not isinstance(line, str):
+            line = str(line)
+        block.append(line[:-1] if line.endswith('\n') else line)
+        if len(block) >= block_size:
+            yield '\n'.join(block)
+            block.clear()
+    if block:
+        yield '\n'.join(block)
+
+
+def _flush_output(output: Union[OutputBuffer, BinaryOutput, AsyncWriter, ThreadedWriter]) -> None:
+    """
+    Write the text buffered by an output engine and flush the stream it writes to. A BinaryOutput flushes its own target, which
+    can be a file descriptor instead of a stream.
+    """
+    output.flush()
+    if not isinstance(output, BinaryOutput):
+        (output.stream or sys.stdout).flush()
+
+
+class RecordSink:
+    """
+    Base class of the objects receiving the events of a SectionPrinter as structured records instead of having them formatted
+    and written (see SectionPrinter.set_record_sink). Subclasses override the methods of the events they need.
+    """
+
+    def on_enter(self, section: _Section) -> None:
         """
-        Does nothing, only used to store static attributes.
+        Called when a section is entered, after its title has been printed.
+        :param section: the new section. Its headers, path (titles of all the sections containing it and of itself) and depth
+        are available as attributes, as well as its parent section.
         """
         pass
 
-    @staticmethod
-    def reset() -> None:
+    def on_exit(self, section: _Section) -> None:
         """
-        Reset the parameters of the decorator.
+        Called when a section is exited.
+        :param section: the section being exited.
         """
-        SectionPrinter.self.headers = []
-        SectionPrinter.self.activated = True
-        SectionPrinter.self.max_depth = None
-        SectionPrinter.self.automatic_skip = False
-        SectionPrinter.self.buffered_skiplines = 0
-        SectionPrinter.self.coloring = True
-        SectionPrinter.self.default_header = '█ '
+        pass
+
+    def on_print(self, section: _Section, style: str, text: str, print_headers: bool, rewrite: bool, end: str) -> None:
+        """
+        Called for each printed text (including the titles of the sections and the automatically skipped lines).
+        :param section: section in which the text is printed.
+        :param style: escape sequences giving its color and effects to the text.
+        :param text: the text, converted to a string. It can contain several lines.
+        :param print_headers: print_headers argument of the print.
+        :param rewrite: rewrite argument of the print.
+        :param end: end argument of the print.
+        """
+        pass
+
+
+class PrinterHook:
+    """
+    Base class of the objects notified of the activity of a printer (see Printer.add_hook), for example to count the output of
+    each section or to export metrics. Subclasses override the methods of the events they need. The hooks are called in the
+    thread printing, so they should be quick.
+    """
+
+    def on_enter(self, section: _Section) -> None:
+        """
+        Called when a section is entered, after its title has been printed.
+        :param section: the new section. Its path (titles of all the sections containing it and of itself) and depth are
+        available as attributes.
+        """
+        pass
+
+    def on_exit(self, section: _Section) -> None:
+        """
+        Called when a section is exited.
+        :param section: the section being exited.
+        """
+        pass
+
+    def on_line(self, section: _Section, n_lines: int, n_bytes: int, suppressed: bool, duration_ns: int) -> None:
+        """
+        Called after each call to print or print_lines (including the printing of the titles of the sections).
+        :param section: section in which the text is printed.
+        :param n_lines: number of lines written, or of lines not shown when the text is suppressed.
+        :param n_bytes: number of bytes written to the main output (UTF-8 encoded, escape sequences included).
+        :param suppressed: true if the text is not shown because the printer is deactivated or the section is deeper than the
+        maximum depth. A suppressed text is not converted to a string: if it is not a string, it counts as one line.
+        :param duration_ns: time spent in the call, in nanoseconds.
+        """
+        pass
+
+
+class LazyText:
+    """
+    Text that is only built when it is converted to a string, which SectionPrinter only does when the text is actually printed.
+    For example, Spt.print(LazyText('Weights: {}', weights)) does not format the weights if the printer is deactivated or if the
+    current section is deeper than the maximum depth.
+    """
+
+    __slots__ = ('message', 'args', 'kwargs')
+
+    def __init__(self, message: Union[str, Callable[..., Any]], *args, **kwargs):
+        """
+        :param message: either a format string, formatted with str.format, or a function returning the text (or any object to
+        convert to a string).
+        :param args: positional arguments given to str.format or to the function.
+        :param kwargs: keyword arguments given to str.format or to the function.
+        """
+        self.message = message
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        if callable(self.message):
+            return str(self.message(*self.args, **self.kwargs))
+        return self.message.format(*self.args, **self.kwargs)
+
+
+class LiveLine:
+    """
+    Status line of the current section that is redrawn in place each time it is updated, for instance to show the progress of a
+    loop. It can be updated any number of times, but it is redrawn at most max_rate times per second, and each redraw only writes
+    the part of the text that changed. The line is finalized when it is closed or when its section is exited.
+    """
+
+    def __init__(self, printer: 'Printer', section: _Section, style: str, max_rate: float, active: bool):
+        """
+        Use SectionPrinter.live_line (or the live_line method of a Printer) to create a live line in the current section.
+        :param printer: printer writing the line.
+        :param section: section in which the line is printed.
+        :param style: escape sequences giving its color and effects to the text.
+        :param max_rate: maximum number of redraws per second. It must be positive, math.inf redrawing on every update.
+        :param active: if set to false, the line never prints anything.
+        """
+        if not max_rate > 0:
+            raise ValueError(f'max_rate must be positive: {max_rate}')
+        self.printer = printer
+        self.section = section
+        self.style = style
+        self.min_interval = 1 / max_rate
+        self.active = active
+        self._text = ''
+        self._drawn_text: Optional[str] = None  # Text currently displayed on the line, None if the line is not displayed
+        self._last_draw = -math.inf
+        if active:
+            printer.live_lines.append(self)
+
+    def update(self, text: Any) -> None:
+        """
+        Set the text of the line. It is only redrawn if the last redraw is old enough, otherwise the text will be drawn by a
+        subsequent update or when the line is closed.
+        :param text: new text of the line. It should be in a single line (no \\n character).
+        """
+        if self.active:
+            self._text = text
+            now = time.monotonic()
+            if now - self._last_draw >= self.min_interval:
+                self._last_draw = now
+                self._draw()
+
+    def progress(self, current: int, total: int, label: str = '', width: int = 30) -> None:
+        """
+        Set the text of the line to a progress bar.
+        :param current: number of steps done.
+        :param total: total number of steps.
+        :param label: text to print before the progress bar.
+        :param width: number of characters of the bar itself.
+        """
+        if self.active:
+            # The bar is only built if it is actually drawn
+            self.update(LazyText(LiveLine._format_progress, current, total, label, width))
 
     @staticmethod
-    def __add_header(header: str, color: Color) -> None:
+    def _format_progress(current: int, total: int, label: str, width: int) -> str:
+        ratio = min(max(current / total, 0.), 1.) if total else 1.
+        filled = int(ratio * width)
+        return f'{label}{" " if label else ""}|{"█" * filled}{" " * (width - filled)}| {ratio:4.0%} ({current}/{total})'
+
+    def _draw(self) -> None:
+        text = self._text if isinstance(self._text, str) else str(self._text)
+        text = Color.remove_colors(text)
+        drawn_text = self._drawn_text
+        if text == drawn_text:
+            return
+
+        if self.printer.coloring:
+            if drawn_text is None:
+                chunk = self.section.prefix + self.style + text + Color.END
+            else:
+                # Move the cursor right after the part that did not change and only rewrite the rest of the line
+                common = len(os.path.commonprefix([drawn_text, text]))
+                column = self.section.width + _display_width(text[:common]) + 1
+                shorter = _display_width(text) < _display_width(drawn_text)
+                chunk = f'\x1b[{column}G' + self.style + text[common:] + Color.END + ('\x1b[K' if shorter else '')
+        else:
+            # Without escape sequences, the line has to be rewritten entirely, padding it to erase a longer previous text
+            padding = ' ' * (_display_width(drawn_text) - _display_width(text)) if drawn_text is not None else ''
+            chunk = ('\r' if drawn_text is not None else '') + self.section.plain_prefix + text + padding
+
+        self.printer.active_live_line = self
+        self._drawn_text = text
+        output = self.printer.output
+        output.write(chunk, 0)
+        _flush_output(output)
+
+    def interrupt(self) -> None:
+        """
+        End the terminal line on which the live line is displayed so that something else can be printed. The live line will be
+        displayed again on a new line at its next redraw.
+        """
+        if self._drawn_text is not None:
+            self.printer.output.write('\n', 1)
+            self._drawn_text = None
+        if self.printer.active_live_line is self:
+            self.printer.active_live_line = None
+
+    def close(self) -> None:
+        """
+        Draw the last text of the line if it has not been drawn yet, and finalize the line.
+        """
+        if self.active:
+            self._draw()
+            self.interrupt()
+            self.active = False
+            try:
+                self.printer.live_lines.remove(self)
+            except ValueError:  # The printer has been reset
+                pass
+
+    def __enter__(self) -> 'LiveLine':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class Printer:
+    """
+    Section printer with its own configuration (coloring, maximum depth, headers, output, sinks, ...) and its own stack of
+    sections. Several printers can be used at the same time without interfering, for example one per component of a program
+    writing to its own stream. The static interface SectionPrinter uses a default printer created when the module is imported.
+    """
+
+    __slots__ = ('print', 'print_lines', 'enter_section', 'exit_section', 'debug', 'info', 'warning', 'error', 'activated',
+                 'profiler', 'level', 'max_depth', 'automatic_skip', 'coloring', 'default_header', 'record_sink', 'rate_states',
+                 'coalescing', 'last_section', 'last_line', 'repetitions', 'active_live_line', 'live_lines', 'output',
+                 'output_stack', 'sinks', 'print_next_headers', 'section_var', 'skiplines_var', 'wrapping', 'wrap_width',
+                 'capture', 'dump_on_error', 'dumped_error', 'hooks', 'emitted_var', 'binary_output', 'tracking', 'config')
+
+    def __init__(self, stream: Optional[TextIO] = None, coloring: bool = True, max_depth: Optional[int] = None,
+                 default_header: str = '█ '):
+        """
+        :param stream: stream to write to. Leave it as None to always write to the current sys.stdout.
+        :param coloring: if set to false, all colors are removed from the text printed.
+        :param max_depth: maximum number of nested sections after which the printer stops printing.
+        :param default_header: header of the sections entered without a header.
+        """
+        # The stack of sections is scoped to the current thread (and to the current asyncio task): nested sections entered by a
+        # worker never leak into the sections of another one.
+        self.section_var = ContextVar('secprint_section', default=_ROOT_SECTION)
+        self.skiplines_var = ContextVar('secprint_buffered_skiplines', default=0)
+        # Lines and bytes written by the print being notified to the hooks, in the thread doing it
+        self.emitted_var = ContextVar('secprint_emitted', default=None)
+        # Parameters given to the constructor, restored by reset
+        self.config = (stream, coloring, max_depth, default_header)
+        self.output = None
+        self.output_stack = []
+        self.sinks = []
+        self.reset()
+
+    def __call__(self, title: str = '', color: Union[Color, Style, str] = Color.NONE,
+                 header: Optional[str] = None) -> '_PrinterSection':
+        """
+        Enter a new section, which is exited at the end of the with block using the result: with printer('Title', 'blue'): ...
+        :param title: name of the section.
+        :param color: color to use for this section.
+        :param header: string to use as header for the whole section. Leave it as None to use the default value.
+        """
+        return _PrinterSection(self, title, color, header)
+
+    def reset(self) -> None:
+        """
+        Reset the parameters of the printer to the ones it was created with.
+        """
+        stream, coloring, max_depth, default_header = self.config
+        self.section_var.set(_ROOT_SECTION)
+        self.activated = True
+        self.profiler = None
+        self.capture = None
+        self.dump_on_error = False
+        self.dumped_error = None
+        self.hooks = ()
+        self.level = logging.NOTSET
+        self._bind_methods()
+        self.max_depth = max_depth
+        self.automatic_skip = False
+        self.skiplines_var.set(0)
+        self.coloring = coloring
+        self.default_header = default_header
+        self.record_sink = None
+        self.rate_states = {}
+        self.coalescing = False
+        self.last_section = None
+        self.last_line = None
+        self.repetitions = 0
+        self.active_live_line = None
+        self.live_lines = []  # Live lines not closed yet, finalized when their section is exited
+        self.print_next_headers = False
+        self.wrapping = False
+        self.wrap_width = None
+        if self.output is not None:
+            self.output.close()
+        for output in reversed(self.output_stack):
+            output.close()
+        for output, _ in self.sinks:
+            output.close()
+        self.output = OutputBuffer(stream)
+        self.output.before_flush = self._write_repetitions
+        self.output_stack = []
+        self.binary_output = None
+        self.sinks = []
+
+    def _add_header(self, header: str, color: Color, title: Any = None) -> None:
         """
         Adds a header to print before the text.
         :param header: header string to print.
         :param color: color of the header to print.
+        :param title: title of the section.
         """
-        SectionPrinter.self.headers.append(color + header + Color.END)
+        title = '' if title is None else title if isinstance(title, str) else str(title)
+        section = self.section_var.get().push(color + header + Color.END, title)
+        self.section_var.set(section)
+        if self.record_sink is not None:
+            self.record_sink.on_enter(section)
 
-    @staticmethod
-    def enter_section(title: Optional[str] = None, color: Union[Color, str] = Color.NONE, header: Optional[str] = None) -> None:
+    def _enter_section(self, title: Optional[str] = None, color: Union[Color, Style, str] = Color.NONE,
+                       header: Optional[str] = None) -> None:
         """
         Enter a new section with the corresponding color code and prints the corresponding title.
         :param title: name of the section.
-        :param color: color to use for this section.
+        :param color: color to use for this section: a Color, its name or a Style (for 256-color and 24-bit colors).
         :param header: string to use as header for the whole section. Leave it as None to use the default value. Use an empty
         string ('') to have no header.
         """
-        SectionPrinter.check_init()
         if header is None:
-            header = SectionPrinter.self.default_header
+            header = self.default_header
 
-        if SectionPrinter.self.automatic_skip:
-            SectionPrinter.__skip_lines(SectionPrinter.self.buffered_skiplines)
-            SectionPrinter.self.buffered_skiplines = 0
+        if self.automatic_skip:
+            self._skip_lines(self.skiplines_var.get())
+            self.skiplines_var.set(0)
 
-        if SectionPrinter.self.activated:
-            if not isinstance(color, Color):
-                color = Color.from_string(color)
+        if self.tracking:
+            color = _style(color)
 
             if title is not None:
-                SectionPrinter.print(title, color=color, bold=True)
+                # The title is printed in the section containing the new one
+                max_depth = self.max_depth
+                if max_depth is None or max_depth >= self.section_var.get().depth or self.capture is not None:
+                    self.print(title, color=color, bold=True)
             else:
-                SectionPrinter.self.print_next_headers = True
+                self.print_next_headers = True
 
-            SectionPrinter.__add_header(header, color)
+            self._add_header(header, color, title)
 
-    @staticmethod
-    def exit_section() -> None:
+    def _exit_section(self) -> None:
         """
         Exit the last section added.
         """
-        if SectionPrinter.self.automatic_skip:
-            if SectionPrinter.self.max_depth is None or SectionPrinter.self.max_depth >= len(SectionPrinter.self.headers):
-                SectionPrinter.self.buffered_skiplines += 1
+        section = self.section_var.get()
+        if self.automatic_skip:
+            if self.max_depth is None or self.max_depth >= section.depth:
+                self.skiplines_var.set(self.skiplines_var.get() + 1)
 
-        if SectionPrinter.self.activated:
-            SectionPrinter.self.headers = SectionPrinter.self.headers[:-1]
+        if self.tracking:
+            self._write_repetitions()
+            # Live lines of this section and of its subsections, whether they are displayed or have been interrupted by a print
+            for live_line in [line for line in self.live_lines if line.section.depth >= section.depth]:
+                line_section = live_line.section
+                while line_section.depth > section.depth:
+                    line_section = line_section.parent
+                if line_section is section:
+                    live_line.close()
+            if self.record_sink is not None:
+                self.record_sink.on_exit(section)
+            section = section.pop()
+            self.section_var.set(section)
 
-    @staticmethod
-    def __skip_lines(n_lines: int):
-        for i in range(n_lines):
-            SectionPrinter.__print_line('', end='\n')
+        self.output.section_exited(section.depth)
+        for output, _ in self.sinks:
+            output.section_exited(section.depth)
 
-    @staticmethod
-    def __print_headers():
-        if SectionPrinter.self.coloring:
-            for header in SectionPrinter.self.headers:
-                print(header, end='')
+    def _timed_enter_section(self, title: Optional[str] = None, color: Union[Color, Style, str] = Color.NONE,
+                             header: Optional[str] = None) -> None:
+        if self.tracking:
+            self._enter_section(title, color, header)
+        self.profiler.enter(title)
+
+    def _timed_exit_section(self) -> None:
+        self.profiler.exit()
+        if self.tracking:
+            self._exit_section()
+
+    def _hooked_enter_section(self, title: Optional[str] = None, color: Union[Color, Style, str] = Color.NONE,
+                              header: Optional[str] = None) -> None:
+        if self.profiler is not None:
+            self._timed_enter_section(title, color, header)
         else:
-            for header in SectionPrinter.self.headers:
-                print(Color.remove_colors(header), end='')
+            self._enter_section(title, color, header)
+        section = self.section_var.get()
+        for hook in self.hooks:
+            hook.on_enter(section)
 
-    @staticmethod
-    def __print_line(text: str = '', color: Color = Color.NONE, bold: bool = False, underline: bool = False, blink: bool = False,
-                     print_headers: bool = True, rewrite: bool = False, end: str = '\n') -> None:
+    def _hooked_exit_section(self) -> None:
+        section = self.section_var.get()
+        for hook in self.hooks:
+            hook.on_exit(section)
+        if self.profiler is not None:
+            self._timed_exit_section()
+        else:
+            self._exit_section()
+
+    def _hooked_print(self, text='', color: Union[Color, Style, str] = Color.NONE, bold: bool = False, underline: bool = False,
+                      blink: bool = False, print_headers: bool = True, rewrite: bool = False, end: str = '\n',
+                      every: Optional[int] = None, interval: Optional[float] = None, key: Optional[Hashable] = None,
+                      level: Optional[int] = None) -> None:
+        if level is not None and level < self.level:
+            return
+        if key is None and (every is not None or interval is not None):
+            # The call site is the caller of this method, not this method itself
+            caller = sys._getframe(1)
+            key = (id(caller.f_code), caller.f_lasti)
+        self._call_hooked(self._print, text, (text, color, bold, underline, blink, print_headers, rewrite, end, every, interval,
+                                               key, level))
+
+    def _hooked_print_lines(self, lines: Union[str, Iterable[Any], TextIO], color: Union[Color, Style, str] = Color.NONE,
+                            bold: bool = False, underline: bool = False, blink: bool = False, print_headers: bool = True,
+                            chunk_size: int = 1000) -> None:
+        self._call_hooked(self._print_lines, lines, (lines, color, bold, underline, blink, print_headers, chunk_size))
+
+    def _call_hooked(self, method: Callable, text: Any, args: tuple) -> None:
         """
-        Print the sections' headers and the input text line.
-        :param text: text to be printed. It should be in a single line (no \n character).
-        :param color: color to give to the text.
-        :param bold: if set to true, prints the text in boldface.
-        :param underline: if set to true, prints the text underlined.
-        :param blink: if set to true, the line will be blinking (not compatible with all consoles).
-        :param print_headers: if set to true, all section headers will be printed before the text.
-        :param rewrite: if set to true, rewrites over the current line instead of printing a new line.
-        :param end: character to print at the end of the line.
+        Call a printing method and notify the hooks of the lines it wrote, or of the lines it did not show.
         """
-        if rewrite:
-            print('\r', end='')
+        section = self.section_var.get()
+        counts = [0, 0]
+        token = self.emitted_var.set(counts)
+        start = time.perf_counter_ns()
+        try:
+            method(*args)
+        finally:
+            duration = time.perf_counter_ns() - start
+            self.emitted_var.reset(token)
+        suppressed = not self.activated or (self.max_depth is not None and self.max_depth < section.depth)
+        if suppressed:
+            # The text is not converted to a string to count its lines, it only counts as one line if it is not a string
+            n_lines = text.count('\n') + 1 if isinstance(text, str) else 1
+            n_bytes = 0
+        else:
+            n_lines, n_bytes = counts
+        for hook in self.hooks:
+            hook.on_line(section, n_lines, n_bytes, suppressed, duration)
 
-        if print_headers:
-            SectionPrinter.__print_headers()
+    def _count_emitted(self, formatted: Tuple[str, int]) -> None:
+        counts = self.emitted_var.get()
+        if counts is not None:
+            counts[0] += formatted[1]
+            counts[1] += len(formatted[0].encode())
 
-        if SectionPrinter.self.coloring:
-            text = color + (Color.BOLD if bold else '') + (Color.UNDERLINE if underline else '') + \
-                   (Color.BLINK if blink else '') + text + Color.END
-        else:
-            text = Color.remove_colors(text)  # we still remove the colors in case the user included them in the text itself
-        print(text, end=end)
+    def _skip_lines(self, n_lines: int):
+        if n_lines > 0 and self.capture is not None:
+            line, _ = _format_text(self.section_var.get(), '', '', self.coloring)
+            self.capture.write(line * n_lines, n_lines)
+        if n_lines > 0 and self.activated:
+            self._write_repetitions()
+            if self.active_live_line is not None:
+                self.active_live_line.interrupt()
+            section = self.section_var.get()
+            sink = self.record_sink
+            if sink is not None:
+                for _ in range(n_lines):
+                    sink.on_print(section, '', '', True, False, '\n')
+            else:
+                line, _ = _format_text(section, '', '', self.coloring)
+                self.output.write(line * n_lines, n_lines)
+                for output, coloring in self.sinks:
+                    line, _ = _format_text(section, '', '', coloring)
+                    output.write(line * n_lines, n_lines)
 
-    @staticmethod
-    def print(text='', color: Union[Color, str] = Color.NONE, bold: bool = False, underline: bool = False, blink: bool = False,
-              print_headers: bool = True, rewrite: bool = False, end: str = '\n') -> None:
+    def _print(self, text='', color: Union[Color, Style, str] = Color.NONE, bold: bool = False, underline: bool = False,
+               blink: bool = False, print_headers: bool = True, rewrite: bool = False, end: str = '\n',
+               every: Optional[int] = None, interval: Optional[float] = None, key: Optional[Hashable] = None,
+               level: Optional[int] = None) -> None:
         """
         Print the sections' headers and the input text
-        :param text: text to be printed.
-        :param color: color to give to the text.
+        :param text: text to be printed. Objects that are not strings are only converted to strings if the text is actually
+        printed, so a LazyText can be used to avoid building a message that would not be printed.
+        :param color: color to give to the text: a Color, its name or a Style (for 256-color and 24-bit colors).
         :param bold: if set to true, prints the text in boldface.
         :param underline: if set to true, prints the text underlined.
         :param blink: if set to true, the text will be blinking (not compatible with all consoles).
         :param print_headers: if set to true, all section headers will be printed before the text.
         :param rewrite: if set to true, rewrites over the current line instead of printing a new line.
         :param end: character to print at the end of the text.
+        :param every: if set, only print one out of every `every` calls (the first one, then the every+1-th one, ...).
+        :param interval: if set, print at most once every `interval` seconds.
+        :param key: key identifying the calls sharing the same every and interval counters. Leave it as None to use the call site
+        (position of the call in the calling code).
+        :param level: level of the text (logging.DEBUG, logging.INFO, ...). The text is dropped before anything else is done when
+        it is below the level of the printer, and it gets the color of its level when no color is given.
         """
-        SectionPrinter.check_init()
+        if level is not None:
+            if level < self.level:
+                return
+            if color is Color.NONE:
+                color = _level_color(level)
+        section = self.section_var.get()
+        shown = self.activated and (self.max_depth is None or self.max_depth >= section.depth)
+        if shown or self.capture is not None:
+            if every is not None or interval is not None:
+                if key is None:
+                    caller = sys._getframe(1)
+                    key = (id(caller.f_code), caller.f_lasti)
+                state = self.rate_states.get(key)
+                if state is None:
+                    state = self.rate_states[key] = [0, -math.inf]
+                n_calls = state[0]
+                state[0] = n_calls + 1
+                if every is not None and n_calls % every:
+                    return
+                if interval is not None:
+                    now = time.monotonic()
+                    if now - state[1] < interval:
+                        return
+                    state[1] = now
 
-        if SectionPrinter.self.activated and (SectionPrinter.self.max_depth is None or
-                                              SectionPrinter.self.max_depth >= len(SectionPrinter.self.headers)):
             if not isinstance(text, str):
                 try:
                     text = str(text)
@@ -216,72 +1166,702 @@ class SectionPrinter:
                     except AttributeError:
                         raise AttributeError('text object is not a string and does not implement __str__ or __repr__')
 
-            if not isinstance(color, Color):
-                color = Color.from_string(color)
+            sink = self.record_sink
+            coloring = self.coloring
+            if coloring or sink is not None or self.sinks:
+                style = _style(color, bold, underline, blink)
+            else:
+                style = ''
+
+            if not shown:
+                self.capture.write(*_format_text(section, text, style, coloring, print_headers, rewrite, end))
+            elif sink is not None:
+                sink.on_print(section, style, text, print_headers, rewrite, end)
+            else:
+                if self.active_live_line is not None:
+                    self.active_live_line.interrupt()
+
+                if self.coalescing:
+                    # Only full lines are coalesced, partial lines (end != '\n') and rewritten lines are always printed
+                    line = (text, style, print_headers) if end == '\n' and not rewrite else None
+                    if line is not None and section is self.last_section and line == self.last_line:
+                        self.repetitions += 1
+                        return
+                    self._write_repetitions()
+                    self.last_section = section
+                    self.last_line = line
 
-            lines = text.split('\n')
-            for i, line in enumerate(lines):
-                line_end = end if i == len(lines) - 1 else '\n'
-                SectionPrinter.__print_line(line, color=color, bold=bold, underline=underline, blink=blink,
-                                            print_headers=print_headers, rewrite=rewrite, end=line_end)
+                if self.wrapping and not rewrite:
+                    text = self._wrap(section, text, print_headers)
+
+                binary = self.binary_output
+                if binary is not None and not self.sinks and self.capture is None and not self.hooks:
+                    self._write_binary(binary, section, text, style, coloring, print_headers, rewrite, end)
+                    return
+
+                # The whole text is assembled first so that it reaches the output in a single write
+                formatted = _format_text(section, text, style, coloring, print_headers, rewrite, end)
+                self.output.write(*formatted)
+                if self.sinks:
+                    self._write_to_sinks(formatted, section, text, style, print_headers, rewrite, end)
+                if self.capture is not None:
+                    self.capture.write(*formatted)
+                if self.hooks:
+                    self._count_emitted(formatted)
+
+    def _write_to_sinks(self, formatted: Tuple[str, int], section: _Section, text: str, style: str, print_headers: bool = True,
+                        rewrite: bool = False, end: str = '\n') -> None:
+        """
+        Write a text to the additional sinks. The variant matching the coloring of the main output is reused as it is, and the
+        other one is formatted at most once, from the colored or plain prefix of the section.
+        :param formatted: the text as formatted for the main output, and its number of lines.
+        """
+        coloring = self.coloring
+        other = None
+        for output, sink_coloring in self.sinks:
+            if sink_coloring == coloring:
+                output.write(*formatted)
+            else:
+                if other is None:
+                    other = _format_text(section, text, style, sink_coloring, print_headers, rewrite, end)
+                output.write(*other)
+
+    def _print_lines(self, lines: Union[str, Iterable[Any], TextIO], color: Union[Color, Style, str] = Color.NONE,
+                     bold: bool = False, underline: bool = False, blink: bool = False, print_headers: bool = True,
+                     chunk_size: int = 1000) -> None:
+        """
+        Print a large number of lines (a table, a file, the output of a generator, ...) with the sections' headers. The lines are
+        consumed lazily and written in blocks of chunk_size lines, so the memory used does not depend on the number of lines and
+        there is a single write per block. Nothing is consumed if the lines would not be printed.
+        :param lines: a text, an iterable of lines (objects that are not strings are converted to strings) or a text file. A final
+        line break does not add an empty line, and the line break ending each line of an iterable or a file is removed.
+        :param color: color to give to the lines.
+        :param bold: if set to true, prints the lines in boldface.
+        :param underline: if set to true, prints the lines underlined.
+        :param blink: if set to true, the lines will be blinking (not compatible with all consoles).
+        :param print_headers: if set to true, all section headers will be printed before each line.
+        :param chunk_size: number of lines of an iterable or a file written at once. Texts are written in blocks of about
+        _TEXT_BLOCK_SIZE characters.
+        """
+        section = self.section_var.get()
+        shown = self.activated and (self.max_depth is None or self.max_depth >= section.depth)
+        if not shown and self.capture is None:
+            return
+
+        if isinstance(lines, str):
+            blocks = _split_blocks(lines, _TEXT_BLOCK_SIZE)
+        else:
+            blocks = _join_blocks(lines, chunk_size)
+
+        sink = self.record_sink
+        coloring = self.coloring
+        if coloring or sink is not None or self.sinks:
+            style = _style(color, bold, underline, blink)
+        else:
+            style = ''
+
+        if not shown:
+            for block in blocks:
+                self.capture.write(*_format_text(section, block, style, coloring, print_headers))
+            return
+        if sink is not None:
+            for block in blocks:
+                sink.on_print(section, style, block, print_headers, False, '\n')
+            return
+
+        if self.active_live_line is not None:
+            self.active_live_line.interrupt()
+        if self.coalescing:
+            self._write_repetitions()
+            self.last_line = None
+
+        output = self.output
+        binary = self.binary_output
+        for block in blocks:
+            if self.wrapping:
+                block = self._wrap(section, block, print_headers)
+            if binary is not None and not self.sinks and self.capture is None and not self.hooks:
+                self._write_binary(binary, section, block, style, coloring, print_headers)
+                continue
+            formatted = _format_text(section, block, style, coloring, print_headers)
+            output.write(*formatted)
+            if self.sinks:
+                self._write_to_sinks(formatted, section, block, style, print_headers)
+            if self.capture is not None:
+                self.capture.write(*formatted)
+            if self.hooks:
+                self._count_emitted(formatted)
 
     @staticmethod
-    def activate() -> None:
+    def _write_binary(binary: BinaryOutput, section: _Section, text: str, style: str, coloring: bool, print_headers: bool = True,
+                      rewrite: bool = False, end: str = '\n') -> None:
+        """
+        Write a text to the binary output, with the encoded prefix of the section: the same bytes as the encoding of _format_text.
+        """
+        if coloring:
+            prefix = section.prefix_bytes
+            style_bytes = style.encoded if style else b''
+            style_end = _END_BYTES
+        else:
+            prefix = section.plain_prefix_bytes
+            text = Color.remove_colors(text)
+            style_bytes = style_end = b''
+        start = prefix if print_headers else b''
+        if rewrite:
+            start = b'\r' + start
+        binary.write_text(start, style_bytes, text, style_end, end)
+
+    def _wrap(self, section: _Section, text: str, print_headers: bool) -> str:
+        """
+        Cut the lines of a text so that, with the headers of the section, they fit in the wrapping width.
+        """
+        width = self.wrap_width or _TERMINAL_WIDTH.get()
+        if print_headers:
+            width -= section.width
+        return _wrap(text, max(width, _MIN_WRAP_WIDTH))
+
+    def _write_repetitions(self) -> None:
+        """
+        Print the number of times the last line has been repeated, if it has been coalesced.
+        """
+        repetitions = self.repetitions
+        if repetitions:
+            self.repetitions = 0
+            self.last_line = None
+            section = self.last_section
+            text = f'repeated ×{repetitions}'
+            formatted = _format_text(section, text, Color.DARK_GRAY, self.coloring)
+            self.output.write(*formatted)
+            if self.sinks:
+                self._write_to_sinks(formatted, section, text, Color.DARK_GRAY)
+
+    def _is_hidden(self) -> bool:
+        """
+        Tell whether nothing printed in a new section would be shown, so that entering it can be skipped altogether.
+        """
+        if self.profiler is not None or self.capture is not None or self.hooks:
+            return False
+        if not self.activated:
+            return True
+        return self.max_depth is not None and self.section_var.get().depth > self.max_depth
+
+    def live_line(self, color: Union[Color, Style, str] = Color.NONE, bold: bool = False, underline: bool = False,
+                  blink: bool = False, max_rate: float = 10) -> LiveLine:
+        """
+        Create a status line in the current section, redrawn in place at most max_rate times per second however often it is
+        updated. It is finalized when closed or when the section is exited. It can also be used as a context manager.
+        :param color: color to give to the text of the line.
+        :param bold: if set to true, prints the text in boldface.
+        :param underline: if set to true, prints the text underlined.
+        :param blink: if set to true, the text will be blinking (not compatible with all consoles).
+        :param max_rate: maximum number of redraws per second. It must be positive, math.inf redrawing on every update.
+        :return: the live line, to update with its update or progress method.
+        """
+        section = self.section_var.get()
+        active = self.activated and self.record_sink is None and (self.max_depth is None or self.max_depth >= section.depth)
+        return LiveLine(self, section, _style(color, bold, underline, blink), max_rate, active)
+
+    def activate(self) -> None:
         """
         Reactivate the printer so that it gets back to work after a call to deactivate.
         """
-        SectionPrinter.check_init()
-        SectionPrinter.self.activated = True
+        self.activated = True
+        self._bind_methods()
 
-    @staticmethod
-    def deactivate() -> None:
+    def deactivate(self) -> None:
         """
         Deactivate the printer so that it does not do anything (printing, entering sections, exiting sections) until reactivation.
+        print, enter_section and exit_section are replaced by functions doing nothing, so that calling them costs almost nothing.
         """
-        SectionPrinter.check_init()
-        SectionPrinter.self.activated = False
+        self.activated = False
+        self._bind_methods()
 
-    @staticmethod
-    def set_coloring(value: bool) -> None:
+    def set_profiler(self, profiler: Optional['SectionProfiler']) -> None:
+        """
+        Sets a profiler measuring the time spent in each section (see secprint.profiler). Sections are timed even while the
+        printer is deactivated. When no profiler is set, entering and exiting sections do not pay anything for timing.
+        :param profiler: profiler to notify when entering and exiting sections. Set it to None to stop timing the sections.
+        """
+        self.profiler = profiler
+        self._bind_methods()
+
+    def _bind_methods(self) -> None:
+        """
+        Bind print, print_lines, enter_section and exit_section to the implementations matching the activation of the printer
+        and the presence of a profiler, a capture or hooks, so that the disabled features do not cost anything.
+        """
+        # While capturing, the sections are tracked and the text is formatted even if the printer is deactivated. With hooks, the
+        # sections are tracked so that the lines that are not shown can be attributed to them.
+        tracking = self.tracking = self.activated or self.capture is not None or bool(self.hooks)
+        self.print = self._print if tracking else _do_nothing
+        self.print_lines = self._print_lines if tracking else _do_nothing
+        if self.hooks:
+            self.print = self._hooked_print
+            self.print_lines = self._hooked_print_lines
+            self.enter_section = self._hooked_enter_section
+            self.exit_section = self._hooked_exit_section
+        elif self.profiler is not None:
+            self.enter_section = self._timed_enter_section
+            self.exit_section = self._timed_exit_section
+        else:
+            self.enter_section = self._enter_section if tracking else _do_nothing
+            self.exit_section = self._exit_section if tracking else _do_nothing
+        # The level methods below the level of the printer do nothing at all, not even converting their text to a string
+        for name, level in _LEVEL_METHODS:
+            setattr(self, name, partial(self.print, level=level) if tracking and level >= self.level else _do_nothing)
+
+        if SectionPrinter.self is self:
+            # The static interface calls the methods of the default printer directly, without any indirection
+            for name in _BOUND_METHODS:
+                setattr(SectionPrinter, name, staticmethod(getattr(self, name)))
+
+    def set_coloring(self, value: bool) -> None:
         """
         Sets on or off the coloring of the text printed. This can be used to deactivate coloring when running a script on a console
         that does not support ANSI escape characters, by just adding a call to set_coloring instead of modifying every call to print
         in the whole script.
         :param value: value to set on or off the coloring of the text.
         """
-        SectionPrinter.check_init()
-        SectionPrinter.self.coloring = value
+        self.coloring = value
 
-    @staticmethod
-    def set_max_depth(value: int) -> None:
+    def set_max_depth(self, value: int) -> None:
         """
         Sets a maximum number of nested sections after which the printer will stop printing (it will still be able to enter or exit
         deeper sections but without printing their title or their header at all).
         :param value: value to set to the max depth parameter.
         """
-        SectionPrinter.check_init()
-        SectionPrinter.self.max_depth = value
+        self.max_depth = value
 
-    @staticmethod
-    def set_automatic_skip(value: bool) -> None:
+    def set_level(self, level: Union[int, str]) -> None:
+        """
+        Sets the minimum level of the texts printed with a level (print(..., level=...), debug, info, warning and error). The
+        methods of the levels below are replaced by functions doing nothing, so that debug prints can be left in hot code.
+        :param level: level of the logging module (logging.DEBUG, ...) or its name ('debug', ...). logging.NOTSET prints everything.
+        """
+        if isinstance(level, str):
+            value = logging.getLevelName(level.upper())
+            if not isinstance(value, int):
+                raise ValueError(f'unknown level: {level}')
+            level = value
+        self.level = level
+        self._bind_methods()
+
+    def set_automatic_skip(self, value: bool) -> None:
         """
         Sets on or off the automatic skip-line mode of the printer. When it's set to True, it will automatically skip an appropriate
         number of lines when exiting a section. When set to false it will not do anything special when exiting a section.
         :param value: value to set on or off the automatic skip-line mode.
         """
-        SectionPrinter.check_init()
-        SectionPrinter.self.automatic_skip = value
+        self.automatic_skip = value
 
-    @staticmethod
-    def set_default_header(value: str) -> None:
+    def set_default_header(self, value: str) -> None:
         """
         Sets a default header text for the sections.
         :param value: text to set the default header to.
         """
-        SectionPrinter.check_init()
-        SectionPrinter.self.default_header = value
+        self.default_header = value
+
+    def set_coalescing(self, value: bool) -> None:
+        """
+        Sets on or off the coalescing of repeated lines. When it's set to True, consecutive identical lines printed in the same
+        section are printed only once, followed by a line telling how many times they have been repeated.
+        :param value: value to set on or off the coalescing of repeated lines.
+        """
+        if not value:
+            self._write_repetitions()
+        self.coalescing = value
+        self.last_line = None
+
+    def set_wrapping(self, value: bool, width: Optional[int] = None) -> None:
+        """
+        Sets on or off the wrapping of long lines. When it's set to True, the lines that would not fit in the width (headers
+        included) are cut, preferably at a space, and the headers are repeated on each wrapped line. The width of the text is
+        measured in terminal columns: escape sequences take none and wide (East Asian) characters take two. Rewritten lines are
+        never wrapped.
+        :param value: value to set on or off the wrapping of long lines.
+        :param width: number of columns of the lines. Leave it as None to use the width of the terminal, which is only queried
+        again when the terminal is resized.
+        """
+        self.wrapping = value
+        self.wrap_width = width
+        if value and width is None:
+            _TERMINAL_WIDTH.watch()
+
+    def set_stream(self, stream: Optional[TextIO]) -> None:
+        """
+        Sets the stream to which the printer writes. Any text still buffered is first written to the previous stream. It cannot
+        be called while a binary output, an asynchronous writer or a background writer is started, since they keep writing to
+        their own target: stop them first.
+        :param stream: stream to write to. Set it to None to always write to the current sys.stdout.
+        """
+        if self.output_stack:
+            raise RuntimeError(f'the stream cannot be changed while a {type(self.output).__name__} is started')
+        self.output.flush()
+        self.output.stream = stream
+
+    def set_flush_policy(self, policy: Union[FlushPolicy, str], max_lines: Optional[int] = None,
+                         max_bytes: Optional[int] = None) -> None:
+        """
+        Sets the policy deciding when the formatted text is handed to the stream. Whatever the policy, the text that is
+        eventually written is exactly the same, only the number and timing of the writes differ.
+        :param policy: one of 'line' (write every print right away), 'count' (write every max_lines lines or max_bytes
+        bytes), 'section' (write when exiting a section) or 'exit' (write when the interpreter exits).
+        :param max_lines: with the 'count' policy, number of buffered lines after which the buffer is written.
+        :param max_bytes: with the 'count' policy, number of buffered bytes (UTF-8 encoded) after which the buffer is written.
+        """
+        output = self.output
+        output.flush()
+        output.policy = FlushPolicy(policy)
+        if max_lines is not None:
+            output.max_lines = max_lines
+        if max_bytes is not None:
+            output.max_bytes = max_bytes
+
+    def add_sink(self, stream: TextIO, coloring: bool = True, policy: Union[FlushPolicy, str] = FlushPolicy.LINE,
+                 max_lines: int = 1000, max_bytes: int = 1 << 16) -> OutputBuffer:
+        """
+        Adds a stream receiving everything printed, in addition to the main stream, with its own coloring and flush policy. For
+        example, the output can be shown with colors on the console while being written without colors to a log file. Each line
+        is formatted once per coloring, whatever the number of sinks. Live lines are only drawn on the main stream.
+        :param stream: stream (or file object) to write to.
+        :param coloring: if set to false, all colors are removed from the text written to this stream.
+        :param policy: policy deciding when the text is handed to this stream (see set_flush_policy).
+        :param max_lines: with the 'count' policy, number of buffered lines after which the buffer is written.
+        :param max_bytes: with the 'count' policy, number of buffered bytes (UTF-8 encoded) after which the buffer is written.
+        :return: the OutputBuffer of the sink, to give to remove_sink.
+        """
+        output = OutputBuffer(stream, policy, max_lines, max_bytes)
+        self.sinks = self.sinks + [(output, coloring)]
+        return output
+
+    def remove_sink(self, output: OutputBuffer) -> None:
+        """
+        Removes a sink added with add_sink, after writing the text it still buffers.
+        :param output: the OutputBuffer returned by add_sink.
+        """
+        self._write_repetitions()
+        self.sinks = [sink for sink in self.sinks if sink[0] is not output]
+        output.close()
+        (output.stream or sys.stdout).flush()
+
+    def add_hook(self, hook: 'PrinterHook') -> None:
+        """
+        Adds a hook notified of the sections entered and exited and of every print, with the lines it wrote (see PrinterHook), for
+        example to export metrics about the output (see secprint.accounting). While hooks are set, the sections are tracked even
+        if the printer is deactivated, so that the prints that are not shown are attributed to their section.
+        :param hook: hook to notify.
+        """
+        self.hooks = self.hooks + (hook,)
+        self._bind_methods()
 
-    def __init__(self, title: str = '', color: Union[Color, str] = Color.NONE, header: Optional[str] = None):
+    def remove_hook(self, hook: 'PrinterHook') -> None:
+        """
+        Removes a hook added with add_hook.
+        :param hook: the hook to remove.
+        """
+        self.hooks = tuple(added for added in self.hooks if added is not hook)
+        self._bind_methods()
+
+    def start_capture(self, max_lines: int = 1000, max_bytes: int = 1 << 20, dump_on_error: bool = True) -> RingBuffer:
+        """
+        Keep the last lines printed in a compact RingBuffer, including the ones that are not shown because the printer is
+        deactivated or because they are deeper than the maximum depth. The detailed output that led to an error can then be
+        dumped, while only the shown lines are written to the stream. While capturing, the sections are tracked and the text is
+        formatted even if the printer is deactivated.
+        :param max_lines: maximum number of lines kept.
+        :param max_bytes: maximum number of bytes kept.
+        :param dump_on_error: if set to true, the captured lines are dumped to sys.stderr when an exception leaves the with block
+        of a section (once per exception, however many with blocks it leaves).
+        :return: the buffer of the captured lines.
+        """
+        self.capture = RingBuffer(max_lines, max_bytes)
+        self.dump_on_error = dump_on_error
+        self._bind_methods()
+        return self.capture
+
+    def stop_capture(self) -> None:
+        """
+        Stop capturing the printed lines and discard the captured ones.
+        """
+        self.capture = None
+        self._bind_methods()
+
+    def dump_capture(self, stream: Optional[TextIO] = None) -> None:
+        """
+        Write the captured lines to a stream, after the text still buffered by the printer.
+        :param stream: stream to write to. Leave it as None to write to the current sys.stderr.
+        """
+        if self.capture is not None:
+            self.flush()
+            self.capture.dump(stream)
+
+    def _section_failed(self, exception: BaseException) -> None:
+        """
+        Dump the captured lines when an exception leaves the with block of a section, if it has not been done already.
+        """
+        if self.capture is not None and self.dump_on_error and self.dumped_error != id(exception):
+            self.dumped_error = id(exception)
+            self.dump_capture()
+
+    def set_record_sink(self, sink: Optional[RecordSink]) -> None:
+        """
+        Sets a RecordSink receiving the entered and exited sections and everything that is printed as structured records, instead
+        of formatting and writing them. This is how worker processes send their output to the parent process (see
+        secprint.multiprocess) and how the output is recorded to a file (see secprint.records). Live lines do not print anything
+        while a record sink is set.
+        :param sink: sink receiving the records. Set it to None to get back to normal printing.
+        """
+        self.record_sink = sink
+
+    def flush(self) -> None:
+        """
+        Write all the buffered text to the stream and to the additional sinks, and flush the streams themselves.
+        """
+        _flush_output(self.output)
+        for output, _ in self.sinks:
+            _flush_output(output)
+
+    def start_binary_output(self, target: Union[BinaryIO, int, None] = None, policy: Union[FlushPolicy, str] = FlushPolicy.COUNT,
+                            max_lines: int = 10000, max_bytes: int = 1 << 16) -> BinaryOutput:
+        """
+        Route the output through a BinaryOutput, which assembles the encoded lines in a reusable bytearray and writes them in large
+        chunks straight to a binary stream or a file descriptor, instead of going through the text layer of a stream. The headers
+        of the sections are only encoded once, when the sections are entered. This is meant for high-volume output: with the
+        default 'count' policy, the lines are only written every max_bytes bytes, on a call to flush and at the interpreter exit.
+        The fast path is used while no sink, capture or hook is set; otherwise the formatted text is encoded as a whole.
+        :param target: binary stream (e.g. sys.stdout.buffer, a file opened in 'wb' mode) or file descriptor to write to. Leave
+        it as None to write to the binary buffer of the current sys.stdout.
+        :param policy: policy deciding when the bytes are written to the target (see set_flush_policy).
+        :param max_lines: with the 'count' policy, number of buffered lines after which the buffer is written.
+        :param max_bytes: with the 'count' policy, number of buffered bytes after which the buffer is written.
+        :return: the binary output.
+        """
+        return self._start_output(BinaryOutput(target, policy, max_lines, max_bytes))
+
+    def stop_binary_output(self) -> None:
+        """
+        Write everything buffered by the BinaryOutput and get back to the output used before it was started.
+        """
+        self._stop_output(BinaryOutput)
+
+    def start_async_writer(self) -> None:
+        """
+        Route the output through an AsyncWriter running on the current event loop, so that printing never blocks the loop on a
+        slow stream. It must be called from a coroutine, and stop_async_writer must be awaited before the loop is closed.
+        """
+        self._start_output(AsyncWriter(self._text_target()))
+
+    async def stop_async_writer(self) -> None:
+        """
+        Wait until the AsyncWriter has written everything, then get back to the output used before it was started.
+        """
+        output = self._find_output(AsyncWriter)
+        if output is not None:
+            await output.drain()
+            self._stop_output(AsyncWriter)
+
+    def start_background_writer(self, max_size: int = 10000,
+                                overflow: Union[OverflowPolicy, str] = OverflowPolicy.BLOCK) -> ThreadedWriter:
+        """
+        Route the output through a ThreadedWriter: printing only formats the text and enqueues it, while a dedicated thread writes
+        it to the stream. Everything is written when the last section is exited, on a call to flush and at the interpreter exit.
+        :param max_size: maximum number of prints waiting to be written.
+        :param overflow: what to do when the queue is full: 'block' (wait for some room), 'drop_oldest' (discard the oldest
+        print of the queue) or 'drop_newest' (discard the new print). The number of discarded prints is counted in the dropped
+        attribute of the returned writer.
+        :return: the writer.
+        """
+        return self._start_output(ThreadedWriter(self._text_target(), max_size, overflow))
+
+    def stop_background_writer(self) -> None:
+        """
+        Wait until the ThreadedWriter has written everything, stop it and get back to the output used before it was started.
+        """
+        self._stop_output(ThreadedWriter)
+
+    def _text_target(self) -> Any:
+        """
+        Get what a new writer of text should write to: the stream of the current output, or the current output itself if it is a
+        BinaryOutput, which encodes the text it is given.
+        """
+        return self.output if isinstance(self.output, BinaryOutput) else self.output.stream
+
+    def _start_output(self, output: Any) -> Any:
+        """
+        Route the output through a new output engine. The current one is kept in the stack of outputs, to get back to it when
+        the new one is stopped.
+        """
+        self.output.flush()
+        output.before_flush = self._write_repetitions
+        self.output_stack.append(self.output)
+        self.output = output
+        self.binary_output = output if isinstance(output, BinaryOutput) else None
+        return output
+
+    def _find_output(self, kind: type) -> Any:
+        """
+        Get the most recently started output engine of a kind that is still started, None if there is none.
+        """
+        for output in [self.output] + self.output_stack[:0:-1]:
+            if isinstance(output, kind):
+                return output
+        return None
+
+    def _stop_output(self, kind: type) -> None:
+        """
+        Close the most recently started output engine of a kind and remove it from the stack of outputs. If other engines have
+        been started since, they are kept, and the one writing to the closed engine writes to what the closed engine wrote to.
+        Stopping an engine that is not started does nothing.
+        """
+        output = self._find_output(kind)
+        if output is None:
+            return
+        stack = self.output_stack
+        if output is self.output:
+            output.close()
+            self.output = stack.pop()
+        else:
+            index = stack.index(output)
+            above = stack[index + 1] if index + 1 < len(stack) else self.output
+            above.flush()
+            output.close()
+            if above.stream is output:
+                below = stack[index - 1]
+                above.stream = below if isinstance(below, BinaryOutput) else below.stream
+            del stack[index]
+        self.binary_output = self.output if isinstance(self.output, BinaryOutput) else None
+
+    def section(self, text: str = '', color: Union[Color, Style, str] = Color.NONE, header: Optional[str] = None,
+                skip_hidden: bool = True):
+        """
+        Parametrized decorator that allows to set a function to do its job inside a section. The function's result is returned.
+        For generator functions the section spans the whole iteration, and for coroutine functions the whole await.
+        :param text: title of the section.
+        :param color: color to use for this section. It is resolved once, when the function is decorated.
+        :param header: string to use as header for the whole section. Leave it as None to use the default header at call time.
+        :param skip_hidden: if set to true, the section is not entered at all when nothing in it can be printed, that is when
+        the printer is deactivated or the current section is already deeper than the maximum depth (and no profiler is set).
+        """
+        color = _style(color)
+
+        def enter() -> bool:
+            if skip_hidden and self._is_hidden():
+                return False
+            self.enter_section(text, color, header)
+            return True
+
+        def decorator(func):
+            if inspect.isasyncgenfunction(func):
+                @wraps(func)
+                async def async_generator_in_section(*args, **kwargs):
+                    entered = enter()
+                    generator = func(*args, **kwargs)
+                    try:
+                        value = await generator.asend(None)
+                        while True:
+                            try:
+                                sent = yield value
+                            except GeneratorExit:
+                                await generator.aclose()
+                                raise
+                            except BaseException as exception:
+                                value = await generator.athrow(exception)
+                            else:
+                                value = await generator.asend(sent)
+                    except StopAsyncIteration:
+                        pass
+                    finally:
+                        if entered:
+                            self.exit_section()
+
+                return async_generator_in_section
+
+            if inspect.iscoroutinefunction(func):
+                @wraps(func)
+                async def coroutine_in_section(*args, **kwargs):
+                    # The section is entered when the coroutine starts running, in the context of the task awaiting it
+                    entered = enter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        if entered:
+                            self.exit_section()
+
+                return coroutine_in_section
+
+            if inspect.isgeneratorfunction(func):
+                @wraps(func)
+                def generator_in_section(*args, **kwargs):
+                    # The section is entered on the first iteration and exited when the generator is exhausted or closed
+                    entered = enter()
+                    try:
+                        return (yield from func(*args, **kwargs))
+                    finally:
+                        if entered:
+                            self.exit_section()
+
+                return generator_in_section
+
+            @wraps(func)
+            def func_in_section(*args, **kwargs):
+                entered = enter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    if entered:
+                        self.exit_section()
+
+            return func_in_section
+
+        return decorator
+
+
+class _PrinterSection:
+    """
+    Section of a Printer entered on creation and exited at the end of the with block using it.
+    """
+
+    __slots__ = ('printer',)
+
+    def __init__(self, printer: Printer, title: str, color: Union[Color, Style, str], header: Optional[str]):
+        self.printer = printer
+        printer.enter_section(title, color, header)
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_val is not None:
+            self.printer._section_failed(exc_val)
+        self.printer.exit_section()
+
+    async def __aenter__(self) -> None:
+        pass
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_val is not None:
+            self.printer._section_failed(exc_val)
+        self.printer.exit_section()
+
+
+class SectionPrinter:
+    """
+    Static interface to the default printer. Every public method of Printer is available as a static method of SectionPrinter
+    acting on the default printer (SectionPrinter.print, SectionPrinter.enter_section, ...), and SectionPrinter(title, color,
+    header) enters a section of the default printer that is exited at the end of the with block using it.
+    """
+
+    # Default printer, created when the module is imported
+    self: Printer = None
+
+    @staticmethod
+    def check_init() -> None:
+        """
+        Kept for compatibility: the default printer is created when the module is imported, so there is nothing to initialize.
+        """
+        pass
+
+    def __init__(self, title: str = '', color: Union[Color, Style, str] = Color.NONE, header: Optional[str] = None):
         # This is a shortcut (Ahem... disgusting trick...) to call
         # a static method of SectionPrinter directly.
         SectionPrinter.enter_section(title, color, header)
@@ -292,19 +1872,37 @@ class SectionPrinter:
 
     @staticmethod
     def __exit__(exc_type, exc_val, exc_tb) -> None:
+        if exc_val is not None:
+            SectionPrinter.self._section_failed(exc_val)
         SectionPrinter.exit_section()
 
     @staticmethod
-    def section(text: str = '', color: Union[Color, str] = Color.NONE):
-        """
-        Parametrized decorator that allows to set a function to do its job inside a SectionPrinter section.
-        """
+    async def __aenter__() -> None:
+        pass
 
-        def decorator(func):
-            def func_in_section(*args, **kwargs):
-                with SectionPrinter(text, color):
-                    func(*args, **kwargs)
+    @staticmethod
+    async def __aexit__(exc_type, exc_val, exc_tb) -> None:
+        if exc_val is not None:
+            SectionPrinter.self._section_failed(exc_val)
+        SectionPrinter.exit_section()
 
-            return func_in_section
 
-        return decorator
+def _do_nothing(*args, **kwargs) -> None:
+    pass
+
+
+# Methods that a printer rebinds to _do_nothing while it is deactivated, or to their timed version while a profiler is set
+_BOUND_METHODS = ('print', 'print_lines', 'enter_section', 'exit_section', 'debug', 'info', 'warning', 'error')
+# Methods printing a text with a level, bound to print with that level while it is not below the level of the printer
+_LEVEL_METHODS = (('debug', logging.DEBUG), ('info', logging.INFO), ('warning', logging.WARNING), ('error', logging.ERROR))
+# Methods of the default printer exposed as static methods of SectionPrinter
+_STATIC_METHODS = ('reset', 'live_line', 'activate', 'deactivate', 'set_profiler', 'set_coloring', 'set_max_depth', 'set_level',
+                   'set_automatic_skip', 'set_default_header', 'set_coalescing', 'set_wrapping', 'set_stream', 'set_flush_policy',
+                   'add_sink', 'remove_sink', 'add_hook', 'remove_hook', 'start_capture', 'stop_capture', 'dump_capture',
+                   'set_record_sink', 'flush', 'start_binary_output', 'stop_binary_output', 'start_async_writer',
+                   'stop_async_writer', 'start_background_writer', 'stop_background_writer', 'section')
+
+SectionPrinter.self = Printer()
+for _name in _STATIC_METHODS:
+    setattr(SectionPrinter, _name, staticmethod(getattr(SectionPrinter.self, _name)))
+SectionPrinter.self._bind_methods()
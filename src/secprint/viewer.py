@@ -0,0 +1,334 @@
+"""
+Command-line viewer for the text logs written by SectionPrinter.
+
+The log file is memory-mapped and scanned once to build an index of its sections (offsets of their title and content, depth,
+number of lines, parent and title), recognized from the headers that SectionPrinter writes before each line. The index is stored
+next to the log and reused as long as the log is not modified, so that huge logs are only scanned once. Sections can then be
+listed, folded, filtered or extracted by copying ranges of the mapped file, without ever reading the whole log into memory.
+
+Usage example::
+
+    secprint-view run.log --tree --fold 2        # Outline of the first two levels of sections
+    secprint-view run.log --fold 1               # Log with every section deeper than the first level folded
+    secprint-view run.log --filter 'Training/Epoch *'
+    secprint-view run.log --extract 'Training/Epoch 3' --plain
+"""
+import argparse
+import bisect
+import mmap
+import os
+import re
+import struct
+import sys
+from fnmatch import fnmatchcase
+from typing import BinaryIO, List, NamedTuple, Optional, Pattern, Sequence, Union
+
+from secprint.records import _STRING_SIZE, _pack_string, _unpack_strings
+from secprint.secprint import _ANSI_ESCAPE_BYTES, SectionPrinter
+
+# Index file format: a magic string, the size and modification time of the log, the headers recognized, the sections and their
+# titles. Strings are stored as their size followed by their UTF-8 encoding.
+_INDEX_MAGIC = b'SECPRINT-INDEX-1\n'
+_INDEX_HEADER = struct.Struct('<QqII')  # Size of the log, its modification time in nanoseconds, numbers of headers and sections
+_INDEX_SECTION = struct.Struct('<QQQQHq')
+INDEX_SUFFIX = '.secidx'
+# Separator of the titles in the path of a section
+PATH_SEPARATOR = '/'
+# Number of bytes copied from the log at once
+_COPY_BLOCK_SIZE = 1 << 20
+
+
+class IndexedSection(NamedTuple):
+    """
+    Section found in a log, located by byte offsets in the log file.
+    """
+
+    start: int  # Offset of the title line of the section (of its first line for sections without title)
+    content_start: int  # Offset of the first line printed inside the section
+    end: int  # Offset following the last line of the section
+    n_lines: int  # Number of lines printed inside the section, including the ones of its subsections
+    depth: int  # Number of headers before the lines of the section
+    parent: int  # Index of the section containing this one, -1 for the sections at the first level
+    title: str  # Title of the section, without colors
+
+
+class LogIndex:
+    """
+    Index of the sections of a log, in the order in which they start.
+    """
+
+    def __init__(self, sections: List[IndexedSection], headers: Sequence[str], size: int, mtime_ns: int):
+        self.sections = sections
+        self.headers = tuple(headers)
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.starts = [section.start for section in sections]
+
+    def path(self, index: int) -> str:
+        """
+        Get the titles of a section and of the sections containing it, joined by PATH_SEPARATOR.
+        """
+        titles = []
+        while index >= 0:
+            section = self.sections[index]
+            titles.append(section.title)
+            index = section.parent
+        return PATH_SEPARATOR.join(reversed(titles))
+
+    def find(self, pattern: str) -> List[int]:
+        """
+        Get the indices of the sections whose path matches a shell-style pattern (e.g. 'Training/Epoch *').
+        """
+        return [i for i in range(len(self.sections)) if fnmatchcase(self.path(i), pattern)]
+
+    def save(self, path: str) -> None:
+        """
+        Store the index in a file. The file is replaced at once, so that an interrupted save never leaves a partial index.
+        """
+        chunks = [_INDEX_MAGIC, _INDEX_HEADER.pack(self.size, self.mtime_ns, len(self.headers), len(self.sections))]
+        chunks += [_pack_string(header) for header in self.headers]
+        chunks += [_INDEX_SECTION.pack(*section[:6]) for section in self.sections]
+        chunks += [_pack_string(section.title) for section in self.sections]
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(temporary_path, 'wb') as file:
+                file.write(b''.join(chunks))
+            os.replace(temporary_path, path)
+        except BaseException:
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def load(path: str) -> Optional['LogIndex']:
+        """
+        Read an index stored in a file. Return None if the file is not an index, or if it is truncated or corrupt.
+        """
+        with open(path, 'rb') as file:
+            data = file.read()
+        if not data.startswith(_INDEX_MAGIC):
+            return None
+        try:
+            offset = len(_INDEX_MAGIC)
+            size, mtime_ns, n_headers, n_sections = _INDEX_HEADER.unpack_from(data, offset)
+            offset += _INDEX_HEADER.size
+            headers = _unpack_strings(data, offset, n_headers)
+            offset += sum(_STRING_SIZE.size + len(header.encode()) for header in headers)
+            fields = list(_INDEX_SECTION.iter_unpack(data[offset:offset + n_sections * _INDEX_SECTION.size]))
+            offset += n_sections * _INDEX_SECTION.size
+            titles = _unpack_strings(data, offset, n_sections)
+            offset += sum(_STRING_SIZE.size + len(title.encode()) for title in titles)
+        except (struct.error, ValueError):
+            return None
+        # A string cut by the end of the file is shorter than its size: the sizes only add up for a complete file
+        if len(fields) != n_sections or offset != len(data):
+            return None
+        return LogIndex([IndexedSection(*section, title) for section, title in zip(fields, titles)], headers, size, mtime_ns)
+
+
+def _prefix_pattern(headers: Sequence[str]) -> Pattern[bytes]:
+    """
+    Get the pattern matching the headers at the start of each line of a log, with the escape sequences around them.
+    """
+    alternatives = [b'\r', _ANSI_ESCAPE_BYTES.pattern] + [re.escape(header.encode()) for header in headers if header]
+    return re.compile(b'(?m)^(?:' + b'|'.join(alternatives) + b')*')
+
+
+def build_index(data: Union[bytes, mmap.mmap], headers: Sequence[str], mtime_ns: int = 0) -> LogIndex:
+    """
+    Scan a log to find its sections. A line belongs to a section of depth n when it starts with n headers (possibly surrounded by
+    escape sequences), and the line before the first line of a section is its title.
+    :param data: content of the log, typically memory-mapped.
+    :param headers: headers of the sections (without their colors), for example SectionPrinter's default header.
+    :param mtime_ns: modification time of the log, stored in the index to detect later modifications.
+    """
+    encoded_headers = [header.encode() for header in headers if header]
+    prefix_pattern = _prefix_pattern(headers)
+    single_header = encoded_headers[0] if len(encoded_headers) == 1 else None
+    size = len(data)
+
+    sections = []  # Fields of the sections, as lists until their end is known
+    stack = []  # Sections containing the current line
+    opened_at = []  # Number of the first content line of each section of the stack
+    top_depth = 0  # Depth of the innermost section containing the current line
+    previous_start = previous_prefix_end = -1  # Previous line, candidate title of a new section
+    previous_depth = 0
+    line_number = 0
+    for match in prefix_pattern.finditer(data):
+        start = match.start()
+        if start >= size:
+            break
+        if single_header is not None:
+            depth = match.group().count(single_header)
+        else:
+            prefix = match.group()
+            depth = sum(prefix.count(header) for header in encoded_headers)
+
+        if depth != top_depth:
+            while depth < top_depth:
+                section = sections[stack.pop()]
+                section[2] = start
+                section[3] = line_number - opened_at.pop()
+                top_depth = sections[stack[-1]][4] if stack else 0
+            for level in range(top_depth + 1, depth + 1):
+                if level == top_depth + 1 and previous_start >= 0 and previous_depth == top_depth:
+                    title = _ANSI_ESCAPE_BYTES.sub(b'', data[previous_prefix_end:start]).decode(errors='replace').strip()
+                    section_start = previous_start
+                else:
+                    title = ''
+                    section_start = start
+                sections.append([section_start, start, size, 0, level, stack[-1] if stack else -1, title])
+                stack.append(len(sections) - 1)
+                opened_at.append(line_number)
+            top_depth = depth
+
+        previous_start = start
+        previous_prefix_end = match.end()
+        previous_depth = depth
+        line_number += 1
+
+    for i, opened in zip(stack, opened_at):
+        sections[i][3] = line_number - opened
+    return LogIndex([IndexedSection(*section) for section in sections], headers, size, mtime_ns)
+
+
+def open_index(data: Union[bytes, mmap.mmap], log_path: str, headers: Sequence[str], index_path: Optional[str] = None,
+               rebuild: bool = False) -> LogIndex:
+    """
+    Get the index of a log, from its index file when it is up to date, or by scanning the log and storing the new index.
+    :param data: content of the log, typically memory-mapped.
+    :param log_path: path of the log.
+    :param headers: headers of the sections, without their colors.
+    :param index_path: path of the index file. Leave it as None to store it next to the log.
+    :param rebuild: if set to true, the log is scanned again even if its index file is up to date.
+    """
+    index_path = index_path or log_path + INDEX_SUFFIX
+    mtime_ns = os.stat(log_path).st_mtime_ns
+    if not rebuild and os.path.exists(index_path):
+        index = LogIndex.load(index_path)
+        if index is not None and (index.size, index.mtime_ns, index.headers) == (len(data), mtime_ns, tuple(headers)):
+            return index
+
+    index = build_index(data, headers, mtime_ns)
+    try:
+        index.save(index_path)
+    except OSError:
+        pass  # The index is only a cache: a read-only location just means scanning again next time
+    return index
+
+
+def _copy(data: Union[bytes, mmap.mmap], start: int, end: int, out: BinaryIO, plain: bool) -> None:
+    """
+    Copy a range of the log by blocks, cut at line breaks so that escape sequences are never split when removing them.
+    """
+    while start < end:
+        block_end = min(end, start + _COPY_BLOCK_SIZE)
+        if block_end < end:
+            line_end = data.rfind(b'\n', start, block_end)
+            if line_end >= 0:
+                block_end = line_end + 1
+        block = data[start:block_end]
+        out.write(_ANSI_ESCAPE_BYTES.sub(b'', block) if plain else block)
+        start = block_end
+
+
+def write_range(data: Union[bytes, mmap.mmap], index: LogIndex, start: int, end: int, out: BinaryIO,
+                fold: Optional[int] = None, plain: bool = False) -> None:
+    """
+    Write a range of the log, replacing the content of the sections deeper than fold by a line counting their lines.
+    :param data: content of the log.
+    :param index: index of the log.
+    :param start: offset of the start of the range, at the start of a line.
+    :param end: offset of the end of the range, at the start of a line.
+    :param out: binary stream to write to.
+    :param fold: maximum depth of the lines written. Leave it as None to write every line.
+    :param plain: if set to true, all colors are removed.
+    """
+    if fold is not None:
+        prefix_pattern = _prefix_pattern(index.headers)
+        sections = index.sections
+        i = bisect.bisect_left(index.starts, start)
+        while i < len(sections) and sections[i].start < end:
+            section = sections[i]
+            if section.depth <= fold:
+                i += 1
+                continue
+            _copy(data, start, section.content_start, out, plain)
+            # The folded lines are replaced by a line with the headers of the first one
+            prefix = prefix_pattern.match(data, section.content_start).group()
+            if plain or b'\x1b' not in prefix:
+                out.write(_ANSI_ESCAPE_BYTES.sub(b'', prefix) + f'[{section.n_lines} lines folded]\n'.encode())
+            else:
+                out.write(prefix + f'[{section.n_lines} lines folded]\x1b[0m\n'.encode())
+            start = section.end
+            i = bisect.bisect_left(index.starts, start, i + 1)
+    _copy(data, start, end, out, plain)
+
+
+def print_tree(index: LogIndex, out: BinaryIO, max_depth: Optional[int] = None) -> None:
+    """
+    Write the outline of the sections of a log: one line per section, indented by its depth, with its number of lines.
+    """
+    lines = []
+    for section in index.sections:
+        if max_depth is None or section.depth <= max_depth:
+            lines.append(f'{"  " * (section.depth - 1)}{section.title or "(untitled)"}  [{section.n_lines} lines]\n')
+            if len(lines) >= 10000:
+                out.write(''.join(lines).encode())
+                lines.clear()
+    out.write(''.join(lines).encode())
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='View the sections of a log written by SectionPrinter.')
+    parser.add_argument('log', help='path of the log file')
+    parser.add_argument('--tree', action='store_true', help='list the sections instead of printing the log')
+    parser.add_argument('--fold', type=int, metavar='DEPTH', help='fold the sections deeper than DEPTH')
+    parser.add_argument('--filter', metavar='PATTERN',
+                        help=f'only print the sections whose path (titles joined by "{PATH_SEPARATOR}") matches this shell-style '
+                             f'pattern')
+    parser.add_argument('--extract', metavar='PATH', help='only print the first section with exactly this path')
+    parser.add_argument('--plain', action='store_true', help='remove all colors')
+    parser.add_argument('--header', action='append', default=[],
+                        help=f'header of the sections, if not the default one ({SectionPrinter.self.default_header!r}). '
+                             f'Can be given several times')
+    parser.add_argument('--index', help=f'path of the index file (default: the log path followed by {INDEX_SUFFIX})')
+    parser.add_argument('--rebuild', action='store_true', help='scan the log again even if its index is up to date')
+    args = parser.parse_args(argv)
+
+    headers = args.header or [SectionPrinter.self.default_header]
+    out = sys.stdout.buffer
+    with open(args.log, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            index = open_index(data, args.log, headers, args.index, args.rebuild)
+
+            if args.tree:
+                print_tree(index, out, args.fold)
+            elif args.extract is not None:
+                for i in range(len(index.sections)):
+                    if index.path(i) == args.extract:
+                        section = index.sections[i]
+                        write_range(data, index, section.start, section.end, out, args.fold, args.plain)
+                        break
+                else:
+                    print(f'No section with the path {args.extract!r}', file=sys.stderr)
+                    return 1
+            elif args.filter is not None:
+                written_until = 0
+                for i in index.find(args.filter):
+                    section = index.sections[i]
+                    if section.start >= written_until:  # Subsections of a section already written are not repeated
+                        write_range(data, index, section.start, section.end, out, args.fold, args.plain)
+                        written_until = section.end
+            else:
+                write_range(data, index, 0, len(data), out, args.fold, args.plain)
+    out.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
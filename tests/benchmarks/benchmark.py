@@ -0,0 +1,319 @@
+"""
+Benchmarks of the printing hot paths of secprint.
+
+Every scenario is run against a stream that discards its text, and reports the number of lines handled per second and the
+typical peak number of bytes allocated while handling one line. The results can be saved as a baseline, and later runs fail
+(exit code 1) when a scenario is slower or allocates more than the baseline beyond a threshold.
+
+Each timing is the median of several repeats, and each repeat is paired with the timing of a fixed calibration workload. The
+speeds are compared in lines per run of the calibration workload, so that the machine getting faster or slower as a whole
+(frequency scaling, other processes, ...) does not show up as a regression. The baseline should still be saved on the machine
+where the comparisons are made.
+
+    python tests/benchmarks/benchmark.py                  # Compare with the stored baseline
+    python tests/benchmarks/benchmark.py --save           # Store the results as the new baseline
+    python tests/benchmarks/benchmark.py -k print -t 0.5  # Only run the scenarios containing 'print', with a 50% threshold
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from secprint import Color, SectionPrinter as Spt, Style
+from secprint.accounting import OutputAccounting
+from secprint.records import BINARY, JSONL, RecordWriter
+
+# Files opened by the scenarios, kept open until the end of the run
+_OPENED_FILES = []
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# Number of times the timing of each scenario is repeated, the median one being kept
+N_REPEATS = 9
+# Minimum duration of one timing, in seconds
+MIN_DURATION = 0.05
+# Minimum duration of one timing of the calibration workload, in seconds
+MIN_CALIBRATION_DURATION = 0.02
+# Number of calls over which the peak allocation is measured, the median one being kept
+N_TRACED_CALLS = 50
+
+SHORT_TEXT = 'step 42: loss = 0.0238'
+MULTI_LINE_TEXT = '\n'.join(f'line {i} of a multi-line payload' for i in range(10))
+TRUECOLOR_STYLE = Style((255, 136, 0), bold=True)
+COLORED_TEXT = ''.join(color + f'word{i} ' for i, color in enumerate(Color)) + Color.END
+# Number of distinct texts cycled through by the scenarios measuring memoized functions without their caches: more than any of
+# the caches holds, so that every call misses
+N_DISTINCT_TEXTS = 8192
+DISTINCT_COLORED_TEXTS = itertools.cycle([f'{COLORED_TEXT}{i}' for i in range(N_DISTINCT_TEXTS)])
+DISTINCT_SHORT_TEXTS = itertools.cycle([f'{SHORT_TEXT} {i}' for i in range(N_DISTINCT_TEXTS)])
+
+
+class NullStream:
+    """
+    Stream discarding everything written to it, so that only the cost of the printer itself is measured.
+    """
+
+    @staticmethod
+    def write(text: str) -> int:
+        return len(text)
+
+    @staticmethod
+    def flush() -> None:
+        pass
+
+
+class Scenario(NamedTuple):
+    name: str
+    setup: Callable[[], None]  # Called once before the scenario runs, after the printer has been reset
+    run: Callable[[], None]  # Call whose cost is measured
+    n_lines: int  # Number of lines handled by one call to run
+
+
+class Result(NamedTuple):
+    lines_per_second: float
+    bytes_per_line: float
+    lines_per_calibration: float  # Lines handled in the time of one run of the calibration workload
+
+
+def _setup(depth: int = 0, coloring: bool = True, activated: bool = True, max_depth=None, wrap_width=None,
+           capture: bool = False, level=None, accounting: bool = False, devnull: Optional[str] = None,
+           record: Optional[str] = None) -> Callable[[], None]:
+    def setup() -> None:
+        Spt.set_stream(NullStream())
+        if devnull == 'text':
+            Spt.set_stream(_open_devnull('w'))
+            Spt.set_flush_policy('count', max_bytes=1 << 16)
+        elif devnull == 'binary':
+            Spt.start_binary_output(_open_devnull('wb'))
+        if record is not None:
+            Spt.set_record_sink(RecordWriter(_open_devnull('wb'), record))
+        Spt.set_coloring(coloring)
+        if capture:
+            Spt.start_capture()
+        if accounting:
+            Spt.add_hook(OutputAccounting())
+        if wrap_width is not None:
+            Spt.set_wrapping(True, wrap_width)
+        for i in range(depth):
+            Spt.enter_section(color=list(Color)[i % 16])
+        Spt.set_max_depth(max_depth)
+        if level is not None:
+            Spt.set_level(level)
+        if not activated:
+            Spt.deactivate()
+
+    return setup
+
+
+def _open_devnull(mode: str):
+    file = open(os.devnull, mode)
+    _OPENED_FILES.append(file)
+    return file
+
+
+def _enter_exit() -> None:
+    Spt.enter_section('Section', Color.CYAN)
+    Spt.exit_section()
+
+
+def _scenarios() -> List[Scenario]:
+    scenarios = []
+    for depth in (1, 8, 64):
+        for coloring in (True, False):
+            name = f'print depth={depth} coloring={"on" if coloring else "off"}'
+            scenarios.append(Scenario(name, _setup(depth, coloring), lambda: Spt.print(SHORT_TEXT), 1))
+
+    scenarios += [
+        Scenario('print colored text depth=8', _setup(8), lambda: Spt.print(SHORT_TEXT, Color.GREEN, bold=True), 1),
+        Scenario('print styled text depth=8', _setup(8), lambda: Spt.print(SHORT_TEXT, TRUECOLOR_STYLE), 1),
+        Scenario('print named color depth=8', _setup(8), lambda: Spt.print(SHORT_TEXT, 'green'), 1),
+        Scenario('print multi-line depth=8', _setup(8), lambda: Spt.print(MULTI_LINE_TEXT), 10),
+        Scenario('print wrapped depth=8', _setup(8, wrap_width=120), lambda: Spt.print(SHORT_TEXT), 1),
+        Scenario('print wrapped long line depth=8', _setup(8, wrap_width=120), lambda: Spt.print(SHORT_TEXT * 20), 5),
+        Scenario('print rewrite depth=8', _setup(8), lambda: Spt.print(SHORT_TEXT, rewrite=True), 1),
+        Scenario('print deactivated depth=8', _setup(8, activated=False), lambda: Spt.print(SHORT_TEXT), 1),
+        Scenario('print beyond max_depth depth=8', _setup(8, max_depth=4), lambda: Spt.print(SHORT_TEXT), 1),
+        Scenario('print with level depth=8', _setup(8), lambda: Spt.info(SHORT_TEXT), 1),
+        Scenario('print below level depth=8', _setup(8, level='info'), lambda: Spt.debug(SHORT_TEXT), 1),
+        Scenario('print captured depth=8', _setup(8, capture=True), lambda: Spt.print(SHORT_TEXT), 1),
+        Scenario('print captured beyond max_depth depth=8', _setup(8, max_depth=4, capture=True), lambda: Spt.print(SHORT_TEXT), 1),
+        Scenario('print to text file depth=8', _setup(8, devnull='text'), lambda: Spt.print(SHORT_TEXT), 1),
+        Scenario('print to binary output depth=8', _setup(8, devnull='binary'), lambda: Spt.print(SHORT_TEXT), 1),
+        Scenario('record JSONL depth=8', _setup(8, record=JSONL), lambda: Spt.print(SHORT_TEXT), 1),
+        Scenario('record binary depth=8', _setup(8, record=BINARY), lambda: Spt.print(SHORT_TEXT), 1),
+        Scenario('print_lines to text file depth=8', _setup(8, devnull='text'), lambda: Spt.print_lines(MULTI_LINE_TEXT), 10),
+        Scenario('print_lines to binary output depth=8', _setup(8, devnull='binary'), lambda: Spt.print_lines(MULTI_LINE_TEXT),
+                 10),
+        Scenario('print accounted depth=8', _setup(8, accounting=True), lambda: Spt.print(SHORT_TEXT), 1),
+        Scenario('enter/exit section depth=1', _setup(1), _enter_exit, 2),
+        Scenario('enter/exit section depth=64', _setup(64), _enter_exit, 2),
+        Scenario('enter/exit section deactivated', _setup(8, activated=False), _enter_exit, 2),
+        Scenario('remove_colors short', _setup(), lambda: Color.remove_colors(next(DISTINCT_COLORED_TEXTS)), 1),
+        Scenario('remove_colors short cached', _setup(), lambda: Color.remove_colors(COLORED_TEXT), 1),
+        Scenario('remove_colors long', _setup(), lambda: Color.remove_colors(COLORED_TEXT * 20), 1),
+        Scenario('rainbow', _setup(), lambda: Color.rainbow(next(DISTINCT_SHORT_TEXTS)), 1),
+        Scenario('rainbow cached', _setup(), lambda: Color.rainbow(SHORT_TEXT), 1),
+    ]
+    return scenarios
+
+
+def _calibration() -> None:
+    """
+    Fixed workload made of the same kind of operations as printing (string concatenations, joins, calls, dictionary lookups),
+    giving the speed of the machine at the time of a measurement.
+    """
+    chunks = []
+    cache = {}
+    for i in range(100):
+        text = cache.get(i % 10)
+        if text is None:
+            text = cache[i % 10] = str(i)
+        chunks.append(SHORT_TEXT + text + '\n')
+    ''.join(chunks)
+
+
+def _n_calls(run: Callable[[], None], min_duration: float) -> int:
+    """
+    Return a number of calls to run lasting at least min_duration.
+    """
+    n_calls = 1
+    while True:
+        duration = _duration(run, n_calls)
+        if duration >= min_duration:
+            return n_calls
+        n_calls *= 2 if duration <= 0 else max(2, min(10, int(min_duration / duration) + 1))
+
+
+def _duration(run: Callable[[], None], n_calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        run()
+    return time.perf_counter() - start
+
+
+def _time(run: Callable[[], None]) -> Tuple[float, float]:
+    """
+    Return the median duration of one call to run, in seconds, and the median ratio between the duration of one call and the
+    duration of the calibration workload measured right before it.
+    """
+    n_calls = _n_calls(run, MIN_DURATION)
+    n_calibration_calls = _n_calls(_calibration, MIN_CALIBRATION_DURATION)
+    durations = []
+    ratios = []
+    for _ in range(N_REPEATS):
+        calibration = _duration(_calibration, n_calibration_calls) / n_calibration_calls
+        duration = _duration(run, n_calls) / n_calls
+        durations.append(duration)
+        ratios.append(duration / calibration)
+    return statistics.median(durations), statistics.median(ratios)
+
+
+def _peak_allocation(run: Callable[[], None]) -> float:
+    """
+    Return the median of the highest number of bytes allocated during one call to run, once its caches are warm. The median
+    ignores the calls that happen to write a whole buffer (or to grow it), which would make the measure depend on the number
+    of calls made before.
+    """
+    run()
+    peaks = []
+    for _ in range(N_TRACED_CALLS):
+        tracemalloc.start()
+        run()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(peaks)
+
+
+def run_scenario(scenario: Scenario) -> Result:
+    Spt.reset()
+    scenario.setup()
+    try:
+        duration, ratio = _time(scenario.run)
+        peak = _peak_allocation(scenario.run)
+    finally:
+        Spt.reset()
+    return Result(scenario.n_lines / duration, peak / scenario.n_lines, scenario.n_lines / ratio)
+
+
+def compare(results: Dict[str, Result], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """
+    Return a description of every regression of the results beyond the threshold, compared to the baseline.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        reference = baseline[name]
+        # The speeds relative to the calibration workload do not depend on the speed of the machine at the time of the run
+        if 'lines_per_calibration' in reference:
+            speed, reference_speed = result.lines_per_calibration, reference['lines_per_calibration']
+        else:
+            speed, reference_speed = result.lines_per_second, reference['lines_per_second']
+        if speed < reference_speed * (1 - threshold):
+            regressions.append(f'{name}: {result.lines_per_second:,.0f} lines/s ({speed / reference_speed - 1:+.0%} relative to '
+                               f'the calibration), baseline {reference["lines_per_second"]:,.0f} lines/s')
+        # A few bytes of slack, so that tiny allocations do not make the comparison flaky
+        if result.bytes_per_line > reference['bytes_per_line'] * (1 + threshold) + 64:
+            regressions.append(f'{name}: {result.bytes_per_line:,.0f} B/line, '
+                               f'baseline {reference["bytes_per_line"]:,.0f} B/line')
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the printing hot paths of secprint.')
+    parser.add_argument('-k', '--filter', default='', help='only run the scenarios whose name contains this text')
+    parser.add_argument('-t', '--threshold', type=float, default=0.25,
+                        help='relative regression tolerated before failing (default: 0.25)')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='path of the baseline file')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    results: Dict[str, Result] = {}
+    rows: List[Tuple[str, ...]] = []
+    for scenario in _scenarios():
+        if args.filter not in scenario.name:
+            continue
+        result = results[scenario.name] = run_scenario(scenario)
+        reference = baseline.get(scenario.name)
+        change = ''
+        if reference and 'lines_per_calibration' in reference:
+            change = f'{result.lines_per_calibration / reference["lines_per_calibration"] - 1:+.0%}'
+        elif reference:
+            change = f'{result.lines_per_second / reference["lines_per_second"] - 1:+.0%}'
+        rows.append((scenario.name, f'{result.lines_per_second:,.0f}', change, f'{result.bytes_per_line:,.0f}'))
+
+    if not rows:
+        print(f'No scenario matches {args.filter!r}', file=sys.stderr)
+        return 1
+    width = max(len(row[0]) for row in rows)
+    print(f'{"scenario":<{width}}  {"lines/s":>12}  {"vs base":>7}  {"B/line":>8}')
+    for name, lines_per_second, change, bytes_per_line in rows:
+        print(f'{name:<{width}}  {lines_per_second:>12}  {change:>7}  {bytes_per_line:>8}')
+
+    if args.save:
+        baseline.update({name: result._asdict() for name, result in results.items()})
+        with open(args.baseline, 'w') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print(f'Baseline saved to {args.baseline}')
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:', file=sys.stderr)
+        for regression in regressions:
+            print(f'  {regression}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
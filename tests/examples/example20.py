@@ -0,0 +1,11 @@
+from secprint import SectionPrinter as Spt
+
+Spt.set_flush_policy('count', max_lines=100)
+
+with Spt("Training", color="blue"):
+    for epoch in range(3):
+        with Spt(f"Epoch {epoch + 1}"):
+            for step in range(50):
+                Spt.print(f"step {step}: loss = {1 / (step + 1):.4f}")
+
+Spt.flush()
@@ -0,0 +1,20 @@
+import threading
+
+from secprint import SectionPrinter as Spt
+
+
+def work(worker_id: int) -> None:
+    # Each thread has its own stack of sections: the sections of the other workers never appear in its headers
+    with Spt(f"Worker {worker_id}", color="green"):
+        for step in range(3):
+            with Spt(f"Step {step + 1}"):
+                Spt.print(f"Worker {worker_id} is doing step {step + 1}")
+
+
+with Spt("Main section", color="blue"):
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    Spt.print("All workers are done")
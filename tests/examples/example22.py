@@ -0,0 +1,23 @@
+import asyncio
+
+from secprint import SectionPrinter as Spt
+
+
+@Spt.section("Fetching", color="cyan")
+async def fetch(resource: str) -> int:
+    # Each task has its own stack of sections, even though they all run concurrently on the same thread
+    for attempt in range(2):
+        Spt.print(f"Fetching {resource} (attempt {attempt + 1})")
+        await asyncio.sleep(0.01)
+    return len(resource)
+
+
+async def main() -> None:
+    Spt.start_async_writer()
+    async with Spt("Main section", color="blue"):
+        sizes = await asyncio.gather(*(fetch(resource) for resource in ["a", "bb", "ccc"]))
+        Spt.print(f"Sizes: {sizes}")
+    await Spt.stop_async_writer()
+
+
+asyncio.run(main())
@@ -0,0 +1,18 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from secprint import SectionPrinter as Spt
+from secprint.multiprocess import RecordListener, init_worker
+
+
+def process(item: int) -> int:
+    with Spt(f"Item {item}", color="green"):
+        Spt.print(f"Squaring {item}")
+        return item * item
+
+
+if __name__ == '__main__':
+    with Spt("Main section", color="blue"):
+        with Spt("Processing items", color="purple"), RecordListener() as listener:
+            with ProcessPoolExecutor(max_workers=4, initializer=init_worker, initargs=(listener.queue,)) as executor:
+                results = list(executor.map(process, range(8)))
+        Spt.print(f"Results: {results}")
@@ -0,0 +1,10 @@
+from secprint import SectionPrinter as Spt
+
+Spt.set_coalescing(True)
+
+with Spt("Training", color="blue"):
+    for step in range(100000):
+        Spt.print(f"step {step}", every=20000)
+        Spt.print("Still running...", interval=1.0)
+    for _ in range(5):
+        Spt.print("Checkpoint saved")
@@ -0,0 +1,18 @@
+import time
+
+from secprint import SectionPrinter as Spt
+
+with Spt("Processing", color="blue"):
+    with Spt.live_line(color="green", max_rate=20) as line:
+        for i in range(1000001):
+            line.progress(i, 1000000, label="Items")
+    Spt.print("First pass done")
+
+    with Spt("Second pass"):
+        status = Spt.live_line()
+        for i in range(30):
+            status.update(f"Step {i + 1}/30")
+            time.sleep(0.01)
+            if i == 14:
+                Spt.print("Halfway there")
+    Spt.print("Second pass done")
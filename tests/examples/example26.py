@@ -0,0 +1,18 @@
+import os
+import tempfile
+
+from secprint import SectionPrinter as Spt
+from secprint.records import BINARY, RecordWriter, render_records
+
+path = os.path.join(tempfile.mkdtemp(), 'run.records')
+
+with RecordWriter(path, format=BINARY) as writer:
+    Spt.set_record_sink(writer)
+    with Spt("Recorded section", color="blue"):
+        for i in range(3):
+            with Spt(f"Subsection {i + 1}", color="green"):
+                Spt.print("Text in subsection")
+    Spt.set_record_sink(None)
+
+# Prints exactly what would have been printed without the record sink
+render_records(path)
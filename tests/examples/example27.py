@@ -0,0 +1,26 @@
+import time
+
+from secprint import SectionPrinter as Spt
+from secprint.profiler import SectionProfiler
+
+profiler = SectionProfiler()
+Spt.set_profiler(profiler)
+Spt.deactivate()  # Sections are timed even when nothing is printed
+
+
+@Spt.section("Load batch")
+def load_batch() -> None:
+    time.sleep(0.002)
+
+
+with Spt("Training"):
+    for epoch in range(3):
+        with Spt("Epoch"):
+            for _ in range(5):
+                load_batch()
+                with Spt("Step"):
+                    time.sleep(0.001)
+
+Spt.activate()
+Spt.set_profiler(None)
+profiler.print_tree()
@@ -0,0 +1,39 @@
+import asyncio
+
+from secprint import SectionPrinter as Spt
+
+
+@Spt.section("Computing", color="green")
+def compute(x):
+    Spt.print(f"Squaring {x}")
+    return x * x
+
+
+@Spt.section("Reading lines", color="cyan")
+def read_lines():
+    for i in range(3):
+        Spt.print(f"Reading line {i}")
+        yield f"line {i}"
+
+
+@Spt.section("Streaming", color="yellow")
+async def stream():
+    for i in range(2):
+        await asyncio.sleep(0)
+        Spt.print(f"Sending chunk {i}")
+        yield i
+
+
+async def consume():
+    return [chunk async for chunk in stream()]
+
+
+Spt.print(f"Result: {compute(4)}")
+Spt.print(f"Lines: {list(read_lines())}")
+Spt.print(f"Chunks: {asyncio.run(consume())}")
+Spt.print(f"Name kept: {compute.__name__}")
+
+Spt.set_max_depth(0)
+with Spt("Hidden"):
+    compute(5)
+Spt.print("Done")
@@ -0,0 +1,12 @@
+import io
+
+from secprint import SectionPrinter as Spt
+
+table = io.StringIO(''.join(f"{i:>3} | {i * i:>5} | {i ** 3:>7}\n" for i in range(1, 11)))
+
+with Spt("Powers", color="blue"):
+    Spt.print(" n |     n² |      n³", bold=True)
+    Spt.print_lines(table)
+
+with Spt("Primes", color="green"):
+    Spt.print_lines((n for n in range(2, 30) if all(n % d for d in range(2, n))), color="yellow", chunk_size=4)
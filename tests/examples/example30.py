@@ -0,0 +1,17 @@
+import io
+
+from secprint import SectionPrinter as Spt
+
+log_file = io.StringIO()
+log = Spt.add_sink(log_file, coloring=False, policy='section')
+
+with Spt("Training", color="blue"):
+    for epoch in range(2):
+        with Spt(f"Epoch {epoch + 1}", color="green"):
+            Spt.print(f"loss = {1 / (epoch + 1):.3f}", color="yellow")
+            Spt.print("\033[31mcolored by hand\033[0m")
+
+Spt.remove_sink(log)
+Spt.print("Written to the log file, without colors:")
+for line in log_file.getvalue().splitlines():
+    Spt.print(f"| {line}")
@@ -0,0 +1,14 @@
+from secprint import Printer, SectionPrinter as Spt
+
+# Independent printers, each with its own sections and settings
+server = Printer(default_header='S| ')
+client = Printer(coloring=False, default_header='C| ')
+
+with server("Server", color="blue"):
+    with client("Client"):
+        server.print("Listening on port 8080")
+        client.print("Connecting to port 8080")
+        Spt.print("The default printer has not entered any section")
+        with server("Request", color="green"):
+            server.print("GET /index.html")
+        client.print("Received 200 OK")
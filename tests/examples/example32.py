@@ -0,0 +1,10 @@
+from secprint import SectionPrinter as Spt
+
+Spt.set_wrapping(True, width=50)
+
+with Spt("Wrapping", color="blue"):
+    with Spt("Long lines", color="green"):
+        Spt.print("Long lines are cut at the last space that fits in the width, and the headers of the sections are "
+                  "repeated at the beginning of each wrapped line.")
+        Spt.print("Wide characters take two columns: " + "漢字" * 12)
+        Spt.print("Words longer than the width are cut anywhere: " + "x" * 60, color="yellow")
@@ -0,0 +1,19 @@
+import sys
+
+from secprint import SectionPrinter as Spt
+
+# Only the first level is shown, but the last 6 lines are kept, whatever their depth
+Spt.set_max_depth(1)
+Spt.start_capture(max_lines=6, dump_on_error=False)
+
+try:
+    with Spt("Job", color="blue"):
+        for batch in range(3):
+            with Spt(f"Batch {batch}", color="green"):
+                for item in range(3):
+                    Spt.print(f"Processing item {item}")
+                if batch == 2:
+                    raise RuntimeError("Corrupted batch")
+except RuntimeError:
+    Spt.dump_capture(sys.stdout)
+    Spt.print("The job failed after the captured lines above", color="red")
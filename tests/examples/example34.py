@@ -0,0 +1,23 @@
+import logging
+
+from secprint import SectionPrinter as Spt
+from secprint.log import SectionHandler
+
+# The records of the standard loggers are printed in the current section, with the color of their level
+logger = logging.getLogger("library")
+logger.setLevel(logging.DEBUG)
+logger.addHandler(SectionHandler())
+
+# Debug texts are dropped before being converted to strings or formatted
+Spt.set_level("info")
+
+with Spt("Training", color="blue"):
+    for epoch in range(3):
+        with Spt(f"Epoch {epoch}", color="green"):
+            Spt.debug(f"Parameters: {list(range(1000))}")
+            Spt.info("Loss decreased")
+            logger.debug("Not printed either")
+            if epoch == 1:
+                logger.warning("Learning rate reduced to %s", 0.001)
+    Spt.error("Validation failed", bold=True)
+    Spt.print("Done", level=logging.INFO, color="cyan")
@@ -0,0 +1,14 @@
+from secprint import Color, SectionPrinter as Spt, Style
+
+# Styles are created once and reused: printing with them does not assemble any escape sequence
+TITLE = Style((255, 136, 0), bold=True)
+WARNING = Style("#ffd700", underline=True)
+GRAYS = [Style(232 + i) for i in range(0, 24, 4)]
+
+with Spt("Extended colors", TITLE):
+    Spt.print("24-bit orange title above, golden underlined warning below")
+    Spt.print("Disk almost full", WARNING)
+    with Spt("256-color palette", Style(33)):
+        for i, gray in enumerate(GRAYS):
+            Spt.print(f"Gray level {i}", gray)
+    Spt.print("Effects can still be added to a style", Style(Color.CYAN), bold=True)
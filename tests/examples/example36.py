@@ -0,0 +1,24 @@
+import sys
+
+from secprint import SectionPrinter as Spt
+from secprint.accounting import OutputAccounting
+
+# Count the output of each section, including the lines hidden by the maximum depth
+accounting = OutputAccounting()
+Spt.add_hook(accounting)
+Spt.set_max_depth(2)
+
+with Spt("Loading", color="blue"):
+    for name in ("train", "test"):
+        Spt.print(f"Reading {name} set")
+with Spt("Training", color="green"):
+    for epoch in range(2):
+        with Spt(f"Epoch {epoch}"):
+            Spt.print_lines(f"batch {batch}" for batch in range(5))
+            with Spt("Details"):
+                Spt.print("Hidden beyond the maximum depth")
+
+Spt.remove_hook(accounting)
+training = accounting.total(("Training",))
+Spt.print(f"Training printed {training.lines} lines ({training.bytes} B), {training.suppressed_lines} hidden")
+accounting.dump(sys.stdout, sort_by="lines", limit=3)
@@ -0,0 +1,13 @@
+from secprint import SectionPrinter as Spt
+
+# The lines are encoded into a reusable buffer and written to sys.stdout.buffer in large chunks
+Spt.start_binary_output()
+
+with Spt("Simulation", color="blue"):
+    for step in range(3):
+        with Spt(f"Step {step}", color="green"):
+            Spt.print_lines(f"particle {i}: x = {i * step}" for i in range(3))
+    Spt.print("Sections can use any character in their headers ✓", color="cyan")
+
+# Everything still buffered is written when the binary output is stopped
+Spt.stop_binary_output()
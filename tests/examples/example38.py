@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+from secprint import SectionPrinter as Spt
+from secprint.viewer import main
+
+path = os.path.join(tempfile.mkdtemp(), 'run.log')
+
+with open(path, 'w') as log:
+    Spt.set_stream(log)
+    with Spt("Training", color="blue"):
+        for epoch in range(3):
+            with Spt(f"Epoch {epoch}", color="green"):
+                Spt.print(f"loss = {1 / (epoch + 1):.3f}")
+                with Spt("Validation", color="cyan"):
+                    Spt.print(f"accuracy = {0.5 + epoch / 10:.2f}")
+    Spt.set_stream(None)
+
+# Same as running: secprint-view run.log --tree, then secprint-view run.log --extract 'Training/Epoch 1'
+main([path, '--tree'])
+main([path, '--extract', 'Training/Epoch 1'])
@@ -0,0 +1,22 @@
+import sys
+
+from secprint import SectionPrinter as Spt
+
+# The binary output writes straight to the file descriptor of the standard output
+Spt.start_binary_output(1)
+Spt.start_capture(dump_on_error=False)
+
+with Spt("Download", color="blue"):
+    with Spt.live_line(color="green") as line:
+        for i in range(101):
+            line.progress(i, 100, label="Files")
+    Spt.print("Files downloaded")
+    # Flushing writes the buffered lines to the file descriptor, which has no stream to flush
+    Spt.flush()
+
+with Spt("Report", color="cyan"):
+    Spt.print("The last lines printed are dumped to the standard output:")
+    Spt.dump_capture(sys.stdout)
+
+Spt.stop_capture()
+Spt.stop_binary_output()